@@ -1,5 +1,6 @@
 import pygame
 import numpy.random as random
+from Common import CommonText
 from . import GameConstants as GC
 
 
@@ -110,8 +111,10 @@ class Sprites:
 class Fonts:
 
     FONT_CONSOLAS: pygame.font.Font = None
+    TEXT_CACHE: CommonText.TextCache = None
 
     @staticmethod
     def init():
 
         Fonts.FONT_CONSOLAS = pygame.font.Font("./assets/fonts/consolas.ttf", 32)
+        Fonts.TEXT_CACHE = CommonText.TextCache(Fonts.FONT_CONSOLAS)
@@ -0,0 +1,223 @@
+import numpy as np
+import numpy.typing as npt
+import pygame
+
+from . import GameConstants as GC
+from . import GameMath
+from . import GameCollision
+
+
+class BulletManager:
+    """
+    the bullets of a shooter as arrays, one slot per bullet
+
+    a bullet is a slot in the arrays, step moves, expires and culls all of them at once
+    and get_hits tests all of them against many hitboxes at once
+    """
+
+    # the per bullet arrays, grown together
+    FIELDS = {
+        "x": np.float64,
+        "y": np.float64,
+        "dir_x": np.float64,
+        "dir_y": np.float64,
+        "speed": np.float64,
+        "born": np.int64,
+        "life": np.int64,
+        "hp": np.int64,
+        "damage": np.int64,
+        "team": np.int64,
+        "alive": bool,
+    }
+
+    def __init__(self, hitbox_width: int = 50, hitbox_height: int = 50, capacity: int = 64) -> None:
+
+        self.hitbox_width = hitbox_width
+        self.hitbox_height = hitbox_height
+
+        # slots below count are in use, step swap removes the dead ones so new bullets reuse their slots
+        self.count = 0
+        self.capacity = 0
+
+        self.spawned = 0
+        self.cleared = 0
+
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+
+        self.grow(capacity)
+
+    def __len__(self):
+
+        return self.count
+
+    def grow(self, capacity: int):
+
+        for name in self.FIELDS:
+
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self.count] = old[: self.count]
+
+            setattr(self, name, new)
+
+        self.capacity = capacity
+
+    def spawn(
+        self,
+        x: float,
+        y: float,
+        target_x: float,
+        target_y: float,
+        speed: float = 10,
+        life_ms: int = 4000,
+        damage: int = 10,
+        hp: int = 30,
+        team: int = 0,
+    ):
+        """adds a bullet flying from (x, y) towards the target, returns its slot"""
+
+        if self.count == self.capacity:
+            self.grow(self.capacity * 2)
+
+        slot = self.count
+        self.count += 1
+        self.spawned += 1
+
+        self.x[slot] = x
+        self.y[slot] = y
+        self.dir_x[slot], self.dir_y[slot] = GameMath.get_normalized_vector(x, y, target_x, target_y)
+        self.speed[slot] = speed
+        self.born[slot] = pygame.time.get_ticks()
+        self.life[slot] = life_ms
+        self.damage[slot] = damage
+        self.hp[slot] = hp
+        self.team[slot] = team
+        self.alive[slot] = True
+
+        return slot
+
+    def get_live_slots(self):
+
+        return np.flatnonzero(self.alive[: self.count])
+
+    def get_hitboxes(self, slots: npt.NDArray):
+        """the (n, 4) x, y, w, h hitboxes of the slots, centered on the bullet and rounded the way Entity.update does it"""
+
+        boxes = np.empty((len(slots), 4), dtype=np.int64)
+
+        boxes[:, 0] = GameCollision.round_half_away(self.x[slots] - self.hitbox_width // 2)
+        boxes[:, 1] = GameCollision.round_half_away(self.y[slots] - self.hitbox_height // 2)
+        boxes[:, 2] = self.hitbox_width
+        boxes[:, 3] = self.hitbox_height
+
+        return boxes
+
+    def step(self):
+        """kills the bullets out of life or far off screen, then moves every bullet along its direction"""
+
+        n = self.count
+        alive = self.alive[:n]
+
+        # the cull tests the hitbox from before the move, a bullet gets one more frame past the edge
+        # same as GameMath.is_rect_off_screen_extended on every hitbox
+        left = self.x[:n] - self.hitbox_width // 2
+        top = self.y[:n] - self.hitbox_height // 2
+        area = GC.SCREEN_RECT_EXTENDED
+
+        alive &= (left < area.right) & (left + self.hitbox_width > area.left)
+        alive &= (top < area.bottom) & (top + self.hitbox_height > area.top)
+        alive &= self.born[:n] + self.life[:n] >= pygame.time.get_ticks()
+
+        # dead bullets move too, it is cheaper than masking and they are removed right after
+        self.x[:n] += self.dir_x[:n] * self.speed[:n]
+        self.y[:n] += self.dir_y[:n] * self.speed[:n]
+
+        self.remove_dead()
+
+    def take_damage(self, slot: int, damage: int):
+        """returns a bool indicating if the bullet is dead, the same as Entity.take_damage_no_i_frames"""
+
+        self.hp[slot] -= damage
+
+        if self.hp[slot] <= 0:
+            self.alive[slot] = False
+
+        return not self.alive[slot]
+
+    def get_hits(self, hitboxes):
+        """for every hitbox the slots of the live bullets overlapping it, lowest slot first"""
+
+        slots = self.get_live_slots()
+
+        hit, bullet = GameCollision.get_colliding_pairs([tuple(hitbox) for hitbox in hitboxes], self.get_hitboxes(slots))
+
+        return np.split(slots[bullet], np.searchsorted(hit, np.arange(1, len(hitboxes))))
+
+    def get_first_hit(self, hitbox):
+        """
+        the lowest live slot overlapping a single hitbox, or None
+
+        tests every bullet directly, for one box that is cheaper than building the grid of get_hits
+        """
+
+        slots = self.get_live_slots()
+        hit = GameCollision.get_overlaps(np.asarray(tuple(hitbox), dtype=np.int64), self.get_hitboxes(slots))
+
+        if not hit.any():
+            return None
+
+        return int(slots[hit.argmax()])
+
+    def get_first_alive(self, slots: npt.NDArray):
+        """the first of the slots that is still alive, or None"""
+
+        for slot in slots.tolist():
+
+            if self.alive[slot]:
+                return slot
+
+        return None
+
+    def remove_dead(self):
+        """swap removes the dead bullets, returns how many were removed"""
+
+        n = self.count
+        dead = np.flatnonzero(~self.alive[:n])
+
+        if not len(dead):
+            return 0
+
+        self.count = GameMath.swap_remove([getattr(self, name) for name in self.FIELDS], dead, n)
+        self.cleared += len(dead)
+
+        return len(dead)
+
+    def render(self, GAME_WINDOW: pygame.Surface, sprite: pygame.Surface, team_color, draw_path: bool = False):
+
+        slots = self.get_live_slots()
+
+        if not len(slots):
+            return
+
+        boxes = self.get_hitboxes(slots).tolist()
+
+        # the sprite is centered on the bullet like Entity.update does with sprite_rect
+        width, height = sprite.get_size()
+        x = GameCollision.round_half_away(self.x[slots]) - width // 2
+        y = GameCollision.round_half_away(self.y[slots]) - height // 2
+
+        GAME_WINDOW.blits([(sprite, position) for position in zip(x.tolist(), y.tolist())], False)
+
+        for box in boxes:
+            pygame.draw.rect(GAME_WINDOW, team_color, box, 2, 1)
+
+        if draw_path:
+
+            for slot in slots.tolist():
+
+                x, y, speed = self.x[slot], self.y[slot], self.speed[slot]
+
+                pygame.draw.line(
+                    GAME_WINDOW, team_color, (x, y), (x + self.dir_x[slot] * speed, y + self.dir_y[slot] * speed)
+                )
@@ -0,0 +1,90 @@
+import numpy as np
+import numpy.typing as npt
+
+from . import GameConstants as GC
+
+
+def round_half_away(values: npt.NDArray):
+    """rounds like assigning a float to a Rect does, 2.5 -> 3 and -2.5 -> -3"""
+
+    return np.copysign(np.floor(np.abs(values) + 0.5), values).astype(np.int64)
+
+
+def get_overlaps(boxes: npt.NDArray, other_boxes: npt.NDArray):
+    """
+    where boxes overlaps other_boxes like Rect.colliderect, both are (..., 4) int arrays of x, y, w, h that broadcast
+
+    the test is strict, so boxes that only touch or are empty never overlap
+    """
+
+    a = boxes[..., 0], boxes[..., 1], boxes[..., 2], boxes[..., 3]
+    b = other_boxes[..., 0], other_boxes[..., 1], other_boxes[..., 2], other_boxes[..., 3]
+
+    return (
+        (a[0] < b[0] + b[2])
+        & (b[0] < a[0] + a[2])
+        & (a[1] < b[1] + b[3])
+        & (b[1] < a[1] + a[3])
+        & (a[2] > 0)
+        & (a[3] > 0)
+        & (b[2] > 0)
+        & (b[3] > 0)
+    )
+
+
+def get_box_cells(boxes: npt.NDArray, cell_size: int):
+    """every (box index, cell key) pair for the grid cells the (n, 4) x, y, w, h boxes touch"""
+
+    left = boxes[:, 0] // cell_size
+    top = boxes[:, 1] // cell_size
+
+    columns = (boxes[:, 0] + boxes[:, 2] - 1) // cell_size - left + 1
+    rows = (boxes[:, 1] + boxes[:, 3] - 1) // cell_size - top + 1
+
+    # empty boxes touch no cells, the same as colliderect never being true for them
+    counts = np.where((boxes[:, 2] > 0) & (boxes[:, 3] > 0), columns * rows, 0)
+    index = np.repeat(np.arange(len(boxes)), counts)
+
+    # position of every cell within its box, 0 to counts - 1
+    offset = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    cell_x = left[index] + offset // rows[index]
+    cell_y = top[index] + offset % rows[index]
+
+    # the cells are far away from 2 ** 31 in both directions, so this packs them without overlap
+    return index, (cell_x << 32) + cell_y
+
+
+def get_colliding_pairs(boxes: npt.NDArray, other_boxes: npt.NDArray, cell_size: int = GC.COLLISION_CELL_SIZE):
+    """
+    uniform grid broadphase, every box is put in each cell it touches and only boxes sharing a cell are tested,
+    the cells are matched by sorting their keys instead of a dict
+
+    returns the (i, j) index arrays of every boxes[i] that overlaps other_boxes[j] like Rect.colliderect,
+    sorted by i then j, the boxes are (n, 4) int arrays of x, y, w, h
+    """
+
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    other_boxes = np.asarray(other_boxes, dtype=np.int64).reshape(-1, 4)
+
+    other_index, other_keys = get_box_cells(other_boxes, cell_size)
+
+    order = np.argsort(other_keys, kind="stable")
+    other_index = other_index[order]
+    other_keys = other_keys[order]
+
+    index, keys = get_box_cells(boxes, cell_size)
+
+    # the run of other cells with the same key as every cell of boxes
+    start = np.searchsorted(other_keys, keys, side="left")
+    counts = np.searchsorted(other_keys, keys, side="right") - start
+
+    i = np.repeat(index, counts)
+    j = other_index[np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+
+    hit = get_overlaps(boxes[i], other_boxes[j])
+
+    # boxes sharing more than one cell show up once for each of them
+    pairs = np.unique(i[hit] * len(other_boxes) + j[hit])
+
+    return pairs // max(len(other_boxes), 1), pairs % max(len(other_boxes), 1)
@@ -7,6 +7,15 @@ HEIGHT = 1000
 SCREEN_RECT = pygame.Rect(0, 0, WIDTH, HEIGHT)
 SCREEN_RECT_EXTENDED = pygame.Rect(-250, -250, WIDTH + 250, HEIGHT + 250)
 
+# size of the cells of the collision broadphase, a bit bigger than most hitboxes
+COLLISION_CELL_SIZE = 128
+
+# the most particles a single effect keeps alive, the oldest are dropped to make room for new ones
+MAX_PARTICLES = 100000
+
+# the lowest a ParticleBudget can push the cap of an effect, enough for a handful of death explosions
+MIN_PARTICLE_BUDGET = 200
+
 MOTION_NONE = 0
 # these values are used to denote movement in a direction
 MOTION_HORIZONTAL_NONE = 0b_0000
@@ -7,6 +7,7 @@ from . import GameAssets as GA
 from . import GameConstants as GC
 from . import GameMath
 from . import GameParticles
+from . import GameBullets
 
 
 class Entity:
@@ -310,13 +311,11 @@ class ShooterEntity(Entity):
         self.bullet_damage = bullet_damage
         self.bullet_life = bullet_life_ms
         self.render_bullet_path = False
-        self.bullets: list[EntityBullet] = []
+        self.bullets = GameBullets.BulletManager()
         self.bullet_speed = bullet_speed
         self.shoot_delay = shoot_delay_ms
         self.last_shoot_time = 0
         self.bullet_sprite = bullet_sprite
-        self.bullet_clearout_interval = 30 * 1000
-        self.last_clear_bullet_time = pygame.time.get_ticks() + self.bullet_clearout_interval
         self.bullet_effect_renders: list[GameParticles.ParticleEffect] = []
 
     def shoot_bullet(self, target_x, target_y):
@@ -324,146 +323,44 @@ class ShooterEntity(Entity):
         if self.last_shoot_time + self.shoot_delay > pygame.time.get_ticks() or self.bullet_sprite is None:
             return
 
-        bullet = EntityBullet(
-            self.bullet_sprite,
-            self.name,
+        self.bullets.spawn(
             self.x,
             self.y,
-            bullet_speed=self.bullet_speed,
+            target_x,
+            target_y,
+            speed=self.bullet_speed,
+            life_ms=self.bullet_life,
+            damage=self.bullet_damage,
+            hp=self.bullet_hp,
             team=self.team,
-            shoot_at_x=target_x,
-            shoot_at_y=target_y,
-            bullet_life_ms=self.bullet_life,
-            bullet_damage=self.bullet_damage,
         )
 
-        bullet.hp = self.bullet_hp
-
-        bullet.draw_bullet_path = self.render_bullet_path
-
-        self.bullets.append(bullet)
-
         self.last_shoot_time = pygame.time.get_ticks()
 
-    def get_bullet_collided_with(self, entity: Entity) -> "EntityBullet":
+    def get_bullet_collided_with(self, entity: Entity) -> int:
+        """the slot in self.bullets of the first bullet that hits the entity, or None"""
 
-        for bullet in self.bullets:
+        if entity.is_dead:
+            return None
 
-            if bullet.collides_with(entity):
-                return bullet
-
-        return None
+        return self.bullets.get_first_hit(entity.hitbox)
 
     def bullets_collid_with(self, entity: Entity):
 
-        for bullet in self.bullets:
-
-            if bullet.collides_with(entity):
-                return True
-
-        return False
+        return self.get_bullet_collided_with(entity) is not None
 
     def render(self, GAME_WINDOW: pygame.Surface):
 
         super().render(GAME_WINDOW)
 
-        for bullet in self.bullets:
-
-            bullet.render(GAME_WINDOW)
+        if self.bullet_sprite is not None:
+            self.bullets.render(GAME_WINDOW, self.bullet_sprite, self.team_color, self.render_bullet_path)
 
     def perform_task(self):
 
         super().perform_task()
 
-        for bullet in self.bullets:
-            bullet.perform_task()
-
-        if self.last_clear_bullet_time + self.bullet_clearout_interval < pygame.time.get_ticks():
-
-            self.last_clear_bullet_time = pygame.time.get_ticks()
-
-            _ = len(self.bullets)
-            self.bullets = list(filter(lambda x: not x.is_dead, self.bullets))
-
-            print(f"Cleared out dead bullets: {_ - len(self.bullets)}")
-
-
-class EntityBullet(Entity):
-    def __init__(
-        self,
-        sprite_sheet: dict[int, pygame.Surface],
-        name: str,
-        x: int = 0,
-        y: int = 0,
-        bullet_speed: int = 10,
-        hitbox_width: int = 50,
-        hitbox_height: int = 50,
-        team: int = 0,
-        shoot_at_x: int = 0,
-        shoot_at_y: int = 0,
-        bullet_damage: int = 10,
-        bullet_life_ms: int = 4000,
-    ) -> None:
-
-        self.draw_bullet_path = False
-        self.shoot_at_x = shoot_at_x
-        self.shoot_at_y = shoot_at_y
-        self.life = bullet_life_ms
-        self.dir_x, self.dir_y = GameMath.get_normalized_vector(x, y, shoot_at_x, shoot_at_y)
-
-        super().__init__(
-            {GC.MOTION_NONE: sprite_sheet},
-            "bullet " + name,
-            x,
-            y,
-            bullet_speed,
-            bullet_speed,
-            hitbox_width,
-            hitbox_height,
-            team,
-            damage=bullet_damage,
-        )
-
-        if self.dynamic_hitbox:
-            self.hitbox.width = self.width * 0.8
-            self.hitbox.height = self.height * 0.8
-
-    def update(self):
-
-        self.sprite_rect.centerx = self.x
-        self.sprite_rect.centery = self.y
-
-        self.hitbox.y = self.y - self.hitbox.height // 2
-        self.hitbox.x = self.x - self.hitbox.width // 2
-
-        if self.alive_at + self.life < pygame.time.get_ticks():
-            self.kill()
-
-    def render(self, GAME_WINDOW: pygame.Surface):
-
-        if self.is_dead:
-            return
-
-        super().render(GAME_WINDOW)
-
-        if self.draw_bullet_path:
-            pygame.draw.line(
-                GAME_WINDOW,
-                self.team_color,
-                (self.x, self.y),
-                (self.x + self.dir_x * self.x_speed, self.y + self.dir_y * self.y_speed),
-            )
-
-    def perform_task(self):
-
-        if self.is_dead:
-            return
-
-        self.move_direction_of_x(self.dir_x)
-        self.move_direction_of_y(self.dir_y)
-
-        if GameMath.is_rect_off_screen_extended(self.hitbox):
-            self.kill()
+        self.bullets.step()
 
 
 class Player(ShooterEntity):
@@ -517,3 +414,52 @@ class Player(ShooterEntity):
         self.move_x(x_motion)
         self.move_y(y_motion)
 
+
+class EntityPool:
+    """a list of entities where the dead ones are swap removed, so they stop being iterated the frame they die"""
+
+    def __init__(self) -> None:
+
+        self.entities: list[Entity] = []
+
+        self.spawned = 0
+        self.cleared = 0
+
+    def __len__(self):
+
+        return len(self.entities)
+
+    def __iter__(self):
+
+        return iter(self.entities)
+
+    def add(self, entity: Entity):
+
+        if entity is None:
+            return
+
+        # remove_dead moves the last entity into the gap of a dead one, so new ones always go at the end
+        self.entities.append(entity)
+        self.spawned += 1
+
+    def remove_dead(self):
+        """swap removes the dead entities, returns how many were removed, not safe while iterating"""
+
+        entities = self.entities
+        removed = 0
+        i = 0
+
+        while i < len(entities):
+
+            if entities[i].is_dead:
+
+                entities[i] = entities[-1]
+                entities.pop()
+                removed += 1
+
+            else:
+                i += 1
+
+        self.cleared += removed
+
+        return removed
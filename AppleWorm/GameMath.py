@@ -64,3 +64,23 @@ def invert_color(color: tuple[int, int, int]):
 
     return (255 - color[0], 255 - color[1], 255 - color[2])
 
+
+def swap_remove(arrays, dead: npt.NDArray, count: int):
+    """
+    removes the rows at the sorted indices in dead from the first count rows of every array without shifting the rest,
+    returns the new count
+    """
+
+    new_count = count - len(dead)
+
+    # the live rows past the new end move into the holes the dead ones left before it
+    keep = np.ones(count - new_count, dtype=bool)
+    keep[dead[dead >= new_count] - new_count] = False
+
+    holes = dead[dead < new_count]
+    moved = np.flatnonzero(keep) + new_count
+
+    for array in arrays:
+        array[holes] = array[moved]
+
+    return new_count
@@ -1,13 +1,18 @@
+import numpy as np
+import numpy.typing as npt
 import pygame
-import numpy.random as random
 
 import math
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from Common import CommonControl
 from . import GameConstants as GC
+from . import GameMath
 
 
 @dataclass(unsafe_hash=True)
 class Particle:
+    """one particle, the effects keep their particles in a ParticleStore and take these through add_particle"""
 
     x: float
     y: float
@@ -15,12 +20,6 @@ class Particle:
     color: tuple[int, int, int]
     is_dead: bool = field(default=False, init=False)
 
-    def render(self, DRAW_SURFACE: pygame.Surface):
-        pass
-
-    def update(self):
-        pass
-
 
 @dataclass(unsafe_hash=True)
 class FallingSquareParticle(Particle):
@@ -30,112 +29,438 @@ class FallingSquareParticle(Particle):
     size: float
     rotate_right: bool = True
 
-    def render(self, DRAW_SURFACE: pygame.Surface):
 
-        if self.is_dead:
-            return
+@dataclass(unsafe_hash=True)
+class CircleParticle(Particle):
 
-        pygame.draw.polygon(DRAW_SURFACE, self.color, self.get_draw_points(), 2)
+    radius: float
+    line_width: int
+    expand_rate: float
+    expand_rate_change: float
 
-    def update(self):
 
-        self.is_dead = self.size < 1
+class ParticleStore:
+    """
+    particles as one numpy array per field, a particle is a row
 
-        if self.is_dead:
-            return
+    fields maps a name to a dtype, or to (dtype, shape) for fields like colors with more than one value
+    dead particles are swap removed so the rows below count are always the live ones
 
-        rotate_right = 1 if self.rotate_right else -1
+    with a max_count the store never holds more, adding to a full store drops the oldest particle like a ring buffer
+    """
 
-        self.y += self.fall_speed
-        self.rotation_rad += self.fall_speed * self.decay_rate * rotate_right
-        self.size -= self.decay_rate
+    def __init__(self, fields: dict, capacity: int = 256, max_count: int = None) -> None:
 
-    def get_draw_points(self):
+        self.fields = {name: value if isinstance(value, tuple) else (value, ()) for name, value in fields.items()}
+        self.arrays: dict[str, npt.NDArray] = {}
 
-        return (
-            (self.x + math.cos(self.rotation_rad) * self.size, self.y + math.sin(self.rotation_rad) * self.size),
-            (
-                self.x + math.cos(self.rotation_rad + GC.DEGREE_90_RAD) * self.size,
-                self.y + math.sin(self.rotation_rad + GC.DEGREE_90_RAD) * self.size,
-            ),
-            (
-                self.x + math.cos(self.rotation_rad + GC.DEGREE_180_RAD) * self.size,
-                self.y + math.sin(self.rotation_rad + GC.DEGREE_180_RAD) * self.size,
-            ),
-            (
-                self.x + math.cos(self.rotation_rad + GC.DEGREE_270_RAD) * self.size,
-                self.y + math.sin(self.rotation_rad + GC.DEGREE_270_RAD) * self.size,
-            ),
-        )
+        # when every particle was added, the oldest has the lowest
+        self.fields["order"] = (np.int64, ())
+        self.next_order = 0
 
+        self.count = 0
+        self.capacity = 0
+        self.max_count = max_count
 
-@dataclass(unsafe_hash=True)
-class CircleParticle(Particle):
+        # particles ever added and the ones dropped before they died, the live ones are len(store)
+        self.spawned = 0
+        self.shed = 0
 
-    radius: float
-    line_width: int
-    expand_rate: float
-    expand_rate_change: float
+        for name, (dtype, shape) in self.fields.items():
+            self.arrays[name] = np.zeros((0,) + shape, dtype=dtype)
 
-    def render(self, DRAW_SURFACE: pygame.Surface):
+        self.grow(capacity if max_count is None else min(capacity, max_count))
 
-        if self.is_dead:
-            return
+    def __len__(self):
 
-        pygame.draw.circle(DRAW_SURFACE, self.color, (self.x, self.y), self.radius, int(self.line_width))
+        return self.count
 
-    def update(self):
+    def __getitem__(self, name: str):
+        """a view of the field for the live particles, changing it changes the particles"""
+
+        return self.arrays[name][: self.count]
+
+    def grow(self, capacity: int):
+
+        for name, (dtype, shape) in self.fields.items():
+
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            new[: self.count] = self.arrays[name][: self.count]
 
-        self.is_dead = self.line_width < 1
+            self.arrays[name] = new
 
-        if self.is_dead:
+        self.capacity = capacity
+
+    def add(self, **values):
+
+        self.add_many(1, **values)
+
+    def add_many(self, amount: int, **values):
+        """adds amount particles in one go, every value is an array with one per particle or a single value for all"""
+
+        if amount <= 0:
             return
 
-        self.radius += self.expand_rate
-        self.line_width -= self.decay_rate
-        self.expand_rate -= self.expand_rate_change
+        # past max_count only the newest would be kept anyway
+        skip = 0 if self.max_count is None else max(amount - self.max_count, 0)
+        amount -= skip
+
+        if self.max_count is not None:
+            self.drop(self.count + amount - self.max_count)
+
+        if self.count + amount > self.capacity:
+
+            capacity = max(self.capacity * 2, self.count + amount)
+            self.grow(capacity if self.max_count is None else min(capacity, self.max_count))
+
+        rows = slice(self.count, self.count + amount)
+
+        for name, value in values.items():
+
+            value = np.asarray(value)
+
+            # more dimensions than the field means one value per particle
+            if value.ndim > len(self.fields[name][1]):
+                value = value[skip:]
+
+            self.arrays[name][rows] = value
+
+        self.arrays["order"][rows] = np.arange(self.next_order, self.next_order + amount)
+        self.next_order += amount
+
+        self.count += amount
+        self.spawned += amount + skip
+        self.shed += skip
+
+    def drop(self, count: int, priority: npt.NDArray = None):
+        """sheds the count particles with the lowest priority, the oldest ones without a priority"""
+
+        count = min(count, self.count)
+
+        if count <= 0:
+            return 0
+
+        if priority is None:
+            priority = self["order"]
+
+        dropped = np.zeros(self.count, dtype=bool)
+        dropped[np.argpartition(priority, count - 1)[:count]] = True
+
+        self.shed += count
+
+        return self.remove(dropped)
+
+    def remove(self, dead: npt.NDArray):
+        """swap removes the particles where dead is true, returns how many were removed"""
+
+        dead = np.flatnonzero(dead)
+
+        if not len(dead):
+            return 0
+
+        self.count = GameMath.swap_remove(self.arrays.values(), dead, self.count)
+
+        return len(dead)
+
+    def clear(self):
+
+        self.count = 0
+
+
+def get_square_corners(x: npt.NDArray, y: npt.NDArray, size: npt.NDArray, rotation: npt.NDArray):
+    """the (n, 4, 2) corners of squares centered on (x, y), size away from the center"""
+
+    # the corners are 90 degrees apart, so one cos and sin gives all of them
+    cos = np.cos(rotation) * size
+    sin = np.sin(rotation) * size
+
+    points = np.empty((len(x), 4, 2))
+
+    np.add(x, cos, out=points[:, 0, 0])
+    np.add(y, sin, out=points[:, 0, 1])
+    np.subtract(x, sin, out=points[:, 1, 0])
+    np.add(y, cos, out=points[:, 1, 1])
+    np.subtract(x, cos, out=points[:, 2, 0])
+    np.subtract(y, sin, out=points[:, 2, 1])
+    np.add(x, sin, out=points[:, 3, 0])
+    np.subtract(y, cos, out=points[:, 3, 1])
+
+    return points
+
+
+def pack_colors(colors: npt.NDArray):
+    """(n, 3) colors as one int each, 0xRRGGBB"""
+
+    colors = colors.astype(np.int64)
+
+    return (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+
+
+def unpack_color(color: int):
+
+    return (color >> 16) & 255, (color >> 8) & 255, color & 255
+
+
+class ParticleAtlas:
+    """
+    square and ring outlines drawn once and blitted after, an LRU of sprites keyed by the quantized shape
+
+    squares are bucketed by size to the pixel and by rotation to rotation_steps per 90 degrees,
+    rings by radius to radius_step pixels and their line width, so a sprite is off by at most one bucket
+    shapes bigger than max_sprite_size are left to be drawn, blitting them costs more than drawing the outline
+    """
+
+    def __init__(
+        self, rotation_steps: int = 24, radius_step: int = 1, max_sprite_size: int = 64, max_pixels: int = 4 * 1024 * 1024
+    ) -> None:
+
+        self.rotation_steps = rotation_steps
+        self.radius_step = radius_step
+        self.max_sprite_size = max_sprite_size
+        self.max_pixels = max_pixels
+
+        # packed key -> sprite, the pixels of all of them are kept under max_pixels
+        self.sprites: OrderedDict[int, pygame.Surface] = OrderedDict()
+        self.pixels = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_sprite(self, key: int, render):
+
+        sprite = self.sprites.get(key)
+
+        if sprite is not None:
+
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+
+        sprite = render(key)
+
+        self.sprites[key] = sprite
+        self.pixels += sprite.get_width() * sprite.get_height()
+
+        while self.pixels > self.max_pixels and len(self.sprites) > 1:
+
+            _, old = self.sprites.popitem(last=False)
+            self.pixels -= old.get_width() * old.get_height()
+
+        return sprite
+
+    def get_sprite_surface(self, color: tuple[int, int, int], half: int):
+        """a square surface with its center pixel at (half, half), transparent by a color key that is never the color"""
+
+        surface = pygame.Surface((half * 2 + 1, half * 2 + 1))
+
+        background = (255 - color[0], 255 - color[1], 255 - color[2])
+
+        surface.fill(background)
+        surface.set_colorkey(background, pygame.RLEACCEL)
+
+        return surface
+
+    def render_square(self, key: int):
+
+        color = unpack_color(key >> 32)
+        size = (key >> 8) & 0xFFFFFF
+        rotation = (key & 255) * GC.DEGREE_90_RAD / self.rotation_steps
+
+        half = size + 2
+        surface = self.get_sprite_surface(color, half)
+
+        # the same corners FallingSquareEffect draws, so the truncation of the points matches too
+        points = get_square_corners(np.array([half]), np.array([half]), size, rotation)[0]
+
+        pygame.draw.polygon(surface, color, points.tolist(), 2)
+
+        return surface
+
+    def render_ring(self, key: int):
+
+        color = unpack_color(key >> 40)
+        radius = (key >> 16) & 0xFFFFFF
+        line_width = key & 0xFFFF
+
+        half = radius + 1
+        surface = self.get_sprite_surface(color, half)
+
+        pygame.draw.circle(surface, color, (half, half), radius, line_width)
+
+        return surface
+
+    def get_blits(self, keys: npt.NDArray, half: npt.NDArray, x: npt.NDArray, y: npt.NDArray, render):
+        """the (sprite, position) pairs that center every sprite on its particle, each sprite is looked up once"""
+
+        unique, inverse = np.unique(keys, return_inverse=True)
+
+        sprites = [self.get_sprite(key, render) for key in unique.tolist()]
+
+        # pygame.draw truncates positions, so the sprites are placed the same way
+        x = x.astype(np.int64) - half
+        y = y.astype(np.int64) - half
+
+        return list(zip(map(sprites.__getitem__, inverse.ravel().tolist()), zip(x.tolist(), y.tolist())))
+
+    def get_square_blits(self, colors: npt.NDArray, x: npt.NDArray, y: npt.NDArray, size: npt.NDArray, rotation: npt.NDArray):
+
+        size = np.maximum(np.floor(size + 0.5).astype(np.int64), 0)
+
+        # squares look the same every 90 degrees
+        rotation = np.floor(rotation / GC.DEGREE_90_RAD * self.rotation_steps + 0.5).astype(np.int64) % self.rotation_steps
+
+        keys = (pack_colors(colors) << 32) | (size << 8) | rotation
+
+        return self.get_blits(keys, size + 2, x, y, self.render_square)
+
+    def get_ring_blits(self, colors: npt.NDArray, x: npt.NDArray, y: npt.NDArray, radius: npt.NDArray, line_width: npt.NDArray):
+
+        # pygame.draw.circle truncates the radius too, with a radius_step of 1 the rings are exact
+        radius = (radius // self.radius_step * self.radius_step).astype(np.int64)
+
+        keys = (pack_colors(colors) << 40) | (radius << 16) | line_width
+
+        return self.get_blits(keys, radius + 1, x, y, self.render_ring)
 
 
 class ParticleEffect:
-    def __init__(self) -> None:
-        self.particles: list[Particle] = []
+    """a group of particles that are updated and drawn together, all the updates are done on whole arrays"""
+
+    FIELDS = {"x": np.float64, "y": np.float64, "decay_rate": np.float64, "color": (np.uint8, (3,))}
+
+    def __init__(self, max_particles: int = GC.MAX_PARTICLES, seed: int = None) -> None:
+        self.particles = ParticleStore(self.FIELDS, max_count=max_particles)
+
+        # every random value of the effect comes from here, so a seed replays the same particles
+        self.rng = np.random.default_rng(seed)
+
+        # the budget is max_particles, lowered by a ParticleBudget while the frames are too slow
+        self.max_particles = max_particles
+
+        # draw with one Surface.blits of pre rendered sprites instead of a pygame.draw call per particle
+        self.use_atlas = False
+        self.atlas = ParticleAtlas()
 
     def render(self, DRAW_SURFACE: pygame.Surface):
-        def predicate_render(x: Particle):
 
-            x.update()
+        self.update()
+        self.draw(DRAW_SURFACE)
 
-            x.render(DRAW_SURFACE)
+    def update(self):
+        pass
+
+    def draw(self, DRAW_SURFACE: pygame.Surface):
+        pass
+
+    def get_priority(self):
+        """what is shed first when over budget, the lowest values go first, None sheds the oldest"""
+
+        return None
 
-            return not x.is_dead
+    def set_budget(self, budget: int):
+        """caps the live particles, the lowest priority ones over the budget are shed right away"""
 
-        self.particles = list(filter(predicate_render, self.particles))
+        self.particles.max_count = max(budget, min(GC.MIN_PARTICLE_BUDGET, self.max_particles))
+        self.particles.drop(len(self.particles) - self.particles.max_count, self.get_priority())
 
     def create_particle_on_chance(self, chance_percent: float):
 
-        if random.random() < chance_percent:
+        if self.rng.random() < chance_percent:
             self.create_particle()
 
     def create_many_in_bounds(self, amount: int, x: int, y: int, width: int, height: int, **kwargs):
-        for i in range(amount):
-            sx = random.randint(x, x + width)
-            sy = random.randint(y, y + height)
-            self.create_particle(x=sx, y=sy, **kwargs)
 
-    def create_particle(self, **kwargs):
+        position = self.rng.integers((x, y), (x + width, y + height), (amount, 2))
+
+        self.create_many(amount, x=position[:, 0], y=position[:, 1], **kwargs)
+
+    def draw_integers(self, amount: int, **ranges):
+        """one rng.integers call for all the [low, high) ranges, returns a column of amount values for each name"""
+
+        low, high = np.array(list(ranges.values())).T
+
+        return dict(zip(ranges, self.rng.integers(low, high, (amount, len(ranges))).T))
+
+    def create_many(self, amount: int, **kwargs):
         pass
 
+    def create_particle(self, **kwargs):
+
+        self.create_many(1, **kwargs)
+
     def add_particle(self, particle: Particle):
-        self.particles.append(particle)
+
+        if particle.is_dead:
+            return
+
+        self.particles.add(**{f.name: getattr(particle, f.name) for f in fields(particle) if f.name != "is_dead"})
 
 
 class FallingSquareEffect(ParticleEffect):
-    def __init__(self, color=(255, 255, 255)) -> None:
-        super().__init__()
+
+    FIELDS = {
+        **ParticleEffect.FIELDS,
+        "fall_speed": np.float64,
+        "rotation_rad": np.float64,
+        "size": np.float64,
+        "rotate_right": bool,
+    }
+
+    def __init__(self, color=(255, 255, 255), max_particles: int = GC.MAX_PARTICLES, seed: int = None) -> None:
+        super().__init__(max_particles, seed)
         self.color = color
 
-    def create_particle(
+    def get_priority(self):
+
+        # squares shrink as they age, so the smallest are also about the oldest and the least visible
+        return self.particles["size"]
+
+    def update(self):
+
+        p = self.particles
+
+        p.remove(p["size"] < 1)
+
+        fall_speed = p["fall_speed"]
+
+        p["y"][:] += fall_speed
+        p["rotation_rad"][:] += fall_speed * p["decay_rate"] * np.where(p["rotate_right"], 1, -1)
+        p["size"][:] -= p["decay_rate"]
+
+    def get_draw_points(self):
+        """the (particles, 4, 2) corners of every square"""
+
+        p = self.particles
+
+        return get_square_corners(p["x"], p["y"], p["size"], p["rotation_rad"])
+
+    def draw(self, DRAW_SURFACE: pygame.Surface):
+
+        p = self.particles
+        drawn = np.ones(len(p), dtype=bool)
+
+        if self.use_atlas:
+
+            drawn = p["size"] > self.atlas.max_sprite_size
+            small = ~drawn
+
+            DRAW_SURFACE.blits(
+                self.atlas.get_square_blits(
+                    p["color"][small], p["x"][small], p["y"][small], p["size"][small], p["rotation_rad"][small]
+                ),
+                False,
+            )
+
+        if not drawn.any():
+            return
+
+        for color, points in zip(p["color"][drawn].tolist(), self.get_draw_points()[drawn].tolist()):
+            pygame.draw.polygon(DRAW_SURFACE, color, points, 2)
+
+    def create_many(
         self,
+        amount: int,
         x: float = None,
         y: float = None,
         rotation: float = None,
@@ -145,32 +470,39 @@ class FallingSquareEffect(ParticleEffect):
         color: tuple[int, int, int] = None,
         rotate_right: bool = None,
     ):
+        """adds amount squares, the values can be arrays of amount, the ones left out are random"""
+
+        # every random field of every square in one call, drawn even when given so a seed gives the same stream
+        drawn = self.draw_integers(
+            amount, x=(0, GC.WIDTH), rotation=(0, 359), fall_speed=(10, 30), size=(15, 40), decay_rate=(10, 30), spin=(1, 6)
+        )
 
         if x is None:
-            x = random.randint(0, GC.WIDTH)
+            x = drawn["x"]
 
         if y is None:
             y = -80
 
         if rotation is None:
-            rotation = math.radians(random.randint(0, 359))
+            rotation = np.radians(drawn["rotation"])
 
         if fall_speed is None:
-            fall_speed = random.randint(10, 30) / 20
+            fall_speed = drawn["fall_speed"] / 20
 
         if size is None:
-            size = random.randint(15, 40)
+            size = drawn["size"]
 
         if decay_rate is None:
-            decay_rate = random.randint(10, 30) / 500
+            decay_rate = drawn["decay_rate"] / 500
 
         if color is None:
             color = self.color
 
         if rotate_right is None:
-            rotate_right = random.randint(1, 6) != 2
+            rotate_right = drawn["spin"] != 2
 
-        particle = FallingSquareParticle(
+        self.particles.add_many(
+            amount,
             x=x,
             y=y,
             rotation_rad=rotation,
@@ -181,16 +513,68 @@ class FallingSquareEffect(ParticleEffect):
             rotate_right=rotate_right,
         )
 
-        self.particles.append(particle)
-
 
 class ExpandingCircle(ParticleEffect):
-    def __init__(self, color=(255, 255, 255)) -> None:
-        super().__init__()
+
+    FIELDS = {
+        **ParticleEffect.FIELDS,
+        "radius": np.float64,
+        "line_width": np.float64,
+        "expand_rate": np.float64,
+        "expand_rate_change": np.float64,
+    }
+
+    def __init__(self, color=(255, 255, 255), max_particles: int = GC.MAX_PARTICLES, seed: int = None) -> None:
+        super().__init__(max_particles, seed)
         self.color = color
 
-    def create_particle(
+    def get_priority(self):
+
+        # rings thin out as they age, the thinnest are the closest to dying anyway
+        return self.particles["line_width"]
+
+    def update(self):
+
+        p = self.particles
+
+        p.remove(p["line_width"] < 1)
+
+        p["radius"][:] += p["expand_rate"]
+        p["line_width"][:] -= p["decay_rate"]
+        p["expand_rate"][:] -= p["expand_rate_change"]
+
+    def draw(self, DRAW_SURFACE: pygame.Surface):
+
+        p = self.particles
+        line_width = p["line_width"].astype(np.int64)
+
+        # a negative width or a radius under 1 draws nothing
+        drawn = (line_width >= 0) & (p["radius"] >= 1)
+
+        if self.use_atlas:
+
+            small = drawn & (p["radius"] <= self.atlas.max_sprite_size)
+            drawn &= ~small
+
+            DRAW_SURFACE.blits(
+                self.atlas.get_ring_blits(
+                    p["color"][small], p["x"][small], p["y"][small], p["radius"][small], line_width[small]
+                ),
+                False,
+            )
+
+        for color, x, y, radius, width in zip(
+            p["color"][drawn].tolist(),
+            p["x"][drawn].tolist(),
+            p["y"][drawn].tolist(),
+            p["radius"][drawn].tolist(),
+            line_width[drawn].tolist(),
+        ):
+            pygame.draw.circle(DRAW_SURFACE, color, (x, y), radius, width)
+
+    def create_many(
         self,
+        amount: int,
         x: float = None,
         y: float = None,
         radius: float = None,
@@ -200,32 +584,46 @@ class ExpandingCircle(ParticleEffect):
         decay_rate: float = None,
         color: tuple[int, int, int] = None,
     ):
+        """adds amount rings, the values can be arrays of amount, the ones left out are random"""
+
+        # every random field of every ring in one call, drawn even when given so a seed gives the same stream
+        drawn = self.draw_integers(
+            amount,
+            x=(0, GC.WIDTH),
+            y=(0, GC.HEIGHT),
+            radius=(1, 10),
+            expand_rate=(10, 30),
+            line_width=(5, 10),
+            decay_rate=(10, 30),
+            expand_rate_change=(10, 30),
+        )
 
         if x is None:
-            x = random.randint(0, GC.WIDTH)
+            x = drawn["x"]
 
         if y is None:
-            y = random.randint(0, GC.HEIGHT)
+            y = drawn["y"]
 
         if radius is None:
-            radius = random.randint(1, 10)
+            radius = drawn["radius"]
 
         if expand_rate is None:
-            expand_rate = random.randint(10, 30)
+            expand_rate = drawn["expand_rate"]
 
         if line_width is None:
-            line_width = random.randint(5, 10)
+            line_width = drawn["line_width"]
 
         if decay_rate is None:
-            decay_rate = random.randint(10, 30) / 15
+            decay_rate = drawn["decay_rate"] / 15
 
         if expand_rate_change is None:
-            expand_rate_change = random.randint(10, 30) / 20
+            expand_rate_change = drawn["expand_rate_change"] / 20
 
         if color is None:
             color = self.color
 
-        particle = CircleParticle(
+        self.particles.add_many(
+            amount,
             x=x,
             y=y,
             decay_rate=decay_rate,
@@ -236,27 +634,177 @@ class ExpandingCircle(ParticleEffect):
             color=color,
         )
 
-        self.particles.append(particle)
+
+class ParticleBudget(CommonControl.FrameTimeController):
+    """
+    lowers the particle budgets of effects from measured frame times to hold a target fps
+
+    every level keeps shed_fraction less of max_particles, down to min_scale of it, the lowest priority particles
+    over the new budget are shed right away and the budgets grow back as the level comes down
+    """
+
+    def __init__(
+        self,
+        effects: list[ParticleEffect],
+        target_fps: float = 60,
+        shed_fraction: float = 0.25,
+        min_scale: float = 0.05,
+        headroom: float = 0.7,
+        settle_frames: int = 15,
+    ) -> None:
+
+        self.effects = effects
+        self.shed_fraction = shed_fraction
+        self.min_scale = min_scale
+
+        # the first level at which the scale reaches min_scale
+        max_level = math.ceil(math.log(min_scale) / math.log(1 - shed_fraction))
+
+        super().__init__(target_fps, max_level, headroom, settle_frames)
+
+    @property
+    def scale(self):
+        """part of max_particles every effect may keep"""
+
+        return max((1 - self.shed_fraction) ** self.level, self.min_scale)
+
+    def get_counts(self):
+        """the spawned, shed and live particles of all the effects"""
+
+        return (
+            sum(effect.particles.spawned for effect in self.effects),
+            sum(effect.particles.shed for effect in self.effects),
+            sum(len(effect.particles) for effect in self.effects),
+        )
+
+    def update(self, frame_time: float):
+        """returns the scale of the budgets for the next frame"""
+
+        level = self.level
+
+        super().update(frame_time)
+
+        # the budget comes from the scale alone, set_budget drops whatever is alive over it
+        if self.level != level:
+
+            for effect in self.effects:
+                effect.set_budget(int(effect.max_particles * self.scale))
+
+        return self.scale
 
 
 class LoopingEffect:
-    """an effect that changes overtime and repeats after at a certain point"""
+    """
+    an effect that changes overtime and repeats after at a certain point
 
-    def __init__(self) -> None:
+    the effect draws a small buffer with render_buffer and draw_buffer puts it on the screen. with a period and
+    use_frame_cache whole frames are kept at the size they are drawn by their phase in the loop, so once the loop
+    has been seen a frame is a single blit. the loop is cut into a phase every cache_step of time, fewer when that
+    many frames would not fit in cache_max_bytes, a frame is off by at most one phase
+    """
+
+    def __init__(self, period: float = None) -> None:
 
         self.time = 0
 
+        # how much time until the effect repeats, None if it does not
+        self.period = period
+
+        self.use_frame_cache = False
+        self.cache_step = 1
+        self.cache_max_bytes = 128 * 1024 * 1024
+
+        # phase -> frame at frame_cache_size, least recently used first
+        self.frame_cache: OrderedDict[int, pygame.Surface] = OrderedDict()
+        self.frame_cache_size = None
+        self.frame_cache_bytes = 0
+        self.frame_cache_hits = 0
+        self.frame_cache_misses = 0
+
     def update(self, change_by: float = 1):
 
         self.time += change_by
 
     def render(self, DRAW_SURFACE: pygame.Surface):
+
+        if not self.use_frame_cache or self.period is None:
+            self.render_frame(DRAW_SURFACE)
+            return
+
+        DRAW_SURFACE.blit(self.get_cached_frame(DRAW_SURFACE), (0, 0))
+
+    def render_frame(self, DRAW_SURFACE: pygame.Surface):
+
+        self.draw_buffer(DRAW_SURFACE, self.render_buffer())
+
+    def render_buffer(self) -> pygame.Surface:
+        """draws the effect at the current time, returns the surface it was drawn on"""
+        pass
+
+    def draw_buffer(self, DRAW_SURFACE: pygame.Surface, buffer: pygame.Surface):
         pass
 
+    def get_cache_phases(self, frame_bytes: int):
+        """how many phases the loop is cut into for frames of frame_bytes"""
+
+        return max(1, min(math.ceil(self.period / self.cache_step), self.cache_max_bytes // max(frame_bytes, 1)))
+
+    def clear_frame_cache(self):
+
+        self.frame_cache.clear()
+        self.frame_cache_bytes = 0
+
+    def get_cached_frame(self, DRAW_SURFACE: pygame.Surface):
+
+        size = DRAW_SURFACE.get_size()
+
+        # the frames are only good for the size they were drawn at
+        if size != self.frame_cache_size:
+
+            self.clear_frame_cache()
+            self.frame_cache_size = size
+
+        frame_bytes = size[0] * size[1] * DRAW_SURFACE.get_bytesize()
+
+        phases = self.get_cache_phases(frame_bytes)
+        phase = int(self.time % self.period / self.period * phases) % phases
+
+        frame = self.frame_cache.get(phase)
+
+        if frame is not None:
+
+            self.frame_cache_hits += 1
+            self.frame_cache.move_to_end(phase)
+            return frame
+
+        self.frame_cache_misses += 1
+
+        # the frame at the start of the phase
+        time = self.time
+        self.time = phase * self.period / phases
+
+        frame = pygame.Surface(size, 0, DRAW_SURFACE)
+        self.render_frame(frame)
+
+        self.time = time
+
+        self.frame_cache[phase] = frame
+        self.frame_cache_bytes += frame_bytes
+
+        # only needed when cache_step or cache_max_bytes change while frames are cached
+        while self.frame_cache_bytes > self.cache_max_bytes and len(self.frame_cache) > 1:
+
+            self.frame_cache.popitem(last=False)
+            self.frame_cache_bytes -= frame_bytes
+
+        return frame
+
 
 class BorderFog(LoopingEffect):
     def __init__(self) -> None:
-        super().__init__()
+
+        # the waves are sin(time / 10) and sin(time / 4), which both repeat every 40 pi
+        super().__init__(40 * math.pi)
 
         self.display_buffer = pygame.Surface((300, 200))
         self.display_bg = (255, 255, 255)
@@ -271,21 +819,13 @@ class BorderFog(LoopingEffect):
         self.effect2_color1 = (0, 0, 0)
         self.effect2_color2 = (0, 2, 4)
 
-    def render(self, DRAW_SURFACE: pygame.Surface):
-
-        w, h = self.display_buffer.get_size()
-
-        effect1_width, effect1_height = w, h * self.effect_1_percent
-        var1 = effect1_height / 4
-
-        effect2_width, effect2_height = w, h * self.effect_2_percent * 2
-        var2 = effect2_height / 2
+        # keep the intermediate surfaces between frames and transform into them instead of making new ones
+        self.use_scratch_surfaces = False
+        self.scratch: dict[str, pygame.Surface] = {}
 
-        # clear old effects and set background
-        self.display_buffer.fill(self.display_bg)
+    def get_back_points(self, w: int, effect1_width: float, var1: float):
 
-        # effect 1
-        b2_points = (
+        return (
             ((effect1_width, var1),)
             + tuple(
                 (
@@ -296,14 +836,10 @@ class BorderFog(LoopingEffect):
             )
             + ((0, var1), (0, 0), (w, 0))
         )
-        back_surf = pygame.Surface((effect1_width, effect1_height))
-        pygame.draw.polygon(back_surf, self.effect1_color1, b2_points)
-        back_surf.set_colorkey(self.effect1_color2)
-        self.display_buffer.blit(back_surf, (0, 0))
-        self.display_buffer.blit(pygame.transform.flip(back_surf, False, True), (0, h - effect1_height))
 
-        # effect 2
-        b_points = (
+    def get_fog_points(self, w: int, var2: float):
+
+        return (
             ((0, var2),)
             + tuple(
                 (w / 30 * (i + 1) + math.sin((self.time + i * 120) / 4) * 8, var2 + math.sin((self.time + i * 10) / 10) * 4)
@@ -311,6 +847,56 @@ class BorderFog(LoopingEffect):
             )
             + ((w, var2), (w, 0), (0, 0))
         )
+
+    def get_scratch(self, name: str, size: tuple[float, float]):
+        """a surface kept between frames in the format of the display buffer, made again only if the size changes"""
+
+        size = (int(size[0]), int(size[1]))
+        surface = self.scratch.get(name)
+
+        if surface is None or surface.get_size() != size:
+
+            surface = pygame.Surface(size, 0, self.display_buffer)
+            self.scratch[name] = surface
+
+        return surface
+
+    def flip_into(self, source: pygame.Surface, dest: pygame.Surface, flip_x: bool, flip_y: bool):
+        """pygame.transform.flip into a surface of the same size"""
+
+        pygame.surfarray.pixels2d(dest)[...] = pygame.surfarray.pixels2d(source)[:: -1 if flip_x else 1, :: -1 if flip_y else 1]
+
+    def rotate_90_into(self, source: pygame.Surface, dest: pygame.Surface):
+        """pygame.transform.rotate by 90 degrees into a surface of the swapped size"""
+
+        pygame.surfarray.pixels2d(dest)[...] = pygame.surfarray.pixels2d(source)[::-1].T
+
+    def render_buffer(self):
+
+        if self.use_scratch_surfaces:
+            return self.render_buffer_scratch()
+
+        w, h = self.display_buffer.get_size()
+
+        effect1_width, effect1_height = w, h * self.effect_1_percent
+        var1 = effect1_height / 4
+
+        effect2_width, effect2_height = w, h * self.effect_2_percent * 2
+        var2 = effect2_height / 2
+
+        # clear old effects and set background
+        self.display_buffer.fill(self.display_bg)
+
+        # effect 1
+        b2_points = self.get_back_points(w, effect1_width, var1)
+        back_surf = pygame.Surface((effect1_width, effect1_height))
+        pygame.draw.polygon(back_surf, self.effect1_color1, b2_points)
+        back_surf.set_colorkey(self.effect1_color2)
+        self.display_buffer.blit(back_surf, (0, 0))
+        self.display_buffer.blit(pygame.transform.flip(back_surf, False, True), (0, h - effect1_height))
+
+        # effect 2
+        b_points = self.get_fog_points(w, var2)
         fog_surf = pygame.Surface((effect2_width, effect2_height))
         pygame.draw.polygon(fog_surf, self.effect2_color2, b_points)
         fog_surf.set_alpha(150)
@@ -327,5 +913,99 @@ class BorderFog(LoopingEffect):
         self.display_buffer.blit(pygame.transform.flip(side_fog, True, True), (w - effect2_height, 0))
         self.display_buffer.blit(pygame.transform.flip(side_fog, True, False), (w - effect2_height + 6, 0))
 
-        # actually render the effect to the game window
-        DRAW_SURFACE.blit(pygame.transform.scale(self.display_buffer, DRAW_SURFACE.get_size()), (0, 0))
+        return self.display_buffer
+
+    def render_buffer_scratch(self):
+        """the same buffer as render_buffer without making any surfaces, every transform writes into a scratch surface"""
+
+        w, h = self.display_buffer.get_size()
+
+        effect1_width, effect1_height = w, h * self.effect_1_percent
+        var1 = effect1_height / 4
+
+        effect2_width, effect2_height = w, h * self.effect_2_percent * 2
+        var2 = effect2_height / 2
+
+        back_surf = self.get_scratch("back", (effect1_width, effect1_height))
+        back_flipped = self.get_scratch("back flipped", back_surf.get_size())
+
+        fog_surf = self.get_scratch("fog", (effect2_width, effect2_height))
+        fog_x = self.get_scratch("fog x", fog_surf.get_size())
+        fog_xy = self.get_scratch("fog xy", fog_surf.get_size())
+        fog_y = self.get_scratch("fog y", fog_surf.get_size())
+
+        # the side fog is the fog turned on its side and squashed to the height of the buffer
+        fog_rotated = self.get_scratch("fog rotated", (fog_surf.get_height(), fog_surf.get_width()))
+        side_fog = self.get_scratch("side", (effect2_height, h))
+        side_y = self.get_scratch("side y", side_fog.get_size())
+        side_xy = self.get_scratch("side xy", side_fog.get_size())
+        side_x = self.get_scratch("side x", side_fog.get_size())
+
+        # pygame.transform hands the colorkey on with RLEACCEL, which blends a little differently, so the copies use it too.
+        # an RLE surface is decoded lossily when locked and keeps blitting its old encoding if written while keyed,
+        # so the keys are taken off while the copies are written and put back right before the blits
+        copies = (back_flipped, fog_x, fog_xy, fog_y, side_fog, side_y, side_xy, side_x)
+
+        for surface in copies:
+            surface.set_colorkey(None)
+
+        # clear old effects and set background
+        self.display_buffer.fill(self.display_bg)
+
+        # effect 1, a new surface starts out black so the scratch one is cleared to black
+        back_surf.fill((0, 0, 0))
+        pygame.draw.polygon(back_surf, self.effect1_color1, self.get_back_points(w, effect1_width, var1))
+        self.flip_into(back_surf, back_flipped, False, True)
+
+        back_surf.set_colorkey(self.effect1_color2)
+        back_flipped.set_colorkey(self.effect1_color2, pygame.RLEACCEL)
+
+        self.display_buffer.blit(back_surf, (0, 0))
+        self.display_buffer.blit(back_flipped, (0, h - effect1_height))
+
+        # effect 2
+        fog_surf.set_colorkey(None)
+        fog_surf.fill((0, 0, 0))
+        pygame.draw.polygon(fog_surf, self.effect2_color2, self.get_fog_points(w, var2))
+        self.flip_into(fog_surf, fog_x, True, False)
+        self.flip_into(fog_surf, fog_xy, True, True)
+        self.flip_into(fog_surf, fog_y, False, True)
+
+        self.rotate_90_into(fog_surf, fog_rotated)
+        pygame.transform.scale(fog_rotated, side_fog.get_size(), side_fog)
+        self.flip_into(side_fog, side_y, False, True)
+        self.flip_into(side_fog, side_xy, True, True)
+        self.flip_into(side_fog, side_x, True, False)
+
+        fog_surf.set_alpha(150)
+        fog_surf.set_colorkey(self.effect2_color1)
+
+        for surface in copies[1:]:
+            surface.set_alpha(150)
+            surface.set_colorkey(self.effect2_color1, pygame.RLEACCEL)
+
+        self.display_buffer.blit(fog_x, (0, -6))
+        self.display_buffer.blit(fog_surf, (0, 0))
+        self.display_buffer.blit(fog_xy, (0, h - effect2_height + 6))
+        self.display_buffer.blit(fog_y, (0, h - effect2_height))
+
+        self.display_buffer.blit(side_y, (-6, 0))
+        self.display_buffer.blit(side_fog, (0, 0))
+        self.display_buffer.blit(side_xy, (w - effect2_height, 0))
+        self.display_buffer.blit(side_x, (w - effect2_height + 6, 0))
+
+        return self.display_buffer
+
+    def draw_buffer(self, DRAW_SURFACE: pygame.Surface, buffer: pygame.Surface):
+
+        if not self.use_scratch_surfaces:
+
+            # actually render the effect to the game window
+            DRAW_SURFACE.blit(pygame.transform.scale(buffer, DRAW_SURFACE.get_size()), (0, 0))
+            return
+
+        # scaled into a kept surface of the window size
+        scaled = self.get_scratch("scaled", DRAW_SURFACE.get_size())
+        pygame.transform.scale(buffer, scaled.get_size(), scaled)
+
+        DRAW_SURFACE.blit(scaled, (0, 0))
@@ -3,7 +3,7 @@ import time
 import random
 import math
 import os
-from typing import Sequence, Tuple
+from typing import Tuple
 import timeit
 import numpy as np
 
@@ -132,17 +132,26 @@ def main():
     time_increment = 500
     time_until_new_enemy = time_increment
 
-    last_dead_clearout_interval = 30 * 1000
-    last_dead_clearout = 0
     mouse_down = False
 
-    entities: Sequence[GameEntities.Entity] = []  # [get_enemy(False, 50 + i * 200, 500, skip=True) for i in range(5)]
+    entities = GameEntities.EntityPool()  # [get_enemy(False, 50 + i * 200, 500, skip=True) for i in range(5)]
 
     clock = pygame.time.Clock()
 
     square_effect = GameParticles.FallingSquareEffect(GA.Colors.BLACK)
     circle_effect = GameParticles.ExpandingCircle(GA.Colors.WHITE)
     border_fog = GameParticles.BorderFog()
+    border_fog.use_scratch_surfaces = True
+
+    # the whole loop does not fit in the frame cache at the window size,
+    # the coarser phases it would need make the fog visibly stutter, so every frame is drawn
+    border_fog.use_frame_cache = False
+
+    square_effect.use_atlas = True
+    circle_effect.use_atlas = True
+
+    # sheds particles when the frames get too slow, mass kills can spawn a lot of them at once
+    particle_budget = GameParticles.ParticleBudget([square_effect, circle_effect], FRAME_RATE)
 
     play_game = True
     while play_game:
@@ -150,7 +159,9 @@ def main():
         pygame.display.update()
         clock.tick(FRAME_RATE)
 
-        game_ticks = pygame.time.get_ticks()
+        # the time of the last frame without the wait of the frame cap
+        particle_budget.update(clock.get_rawtime() / 1000)
+
         game_time += 1
 
         events = pygame.event.get()
@@ -165,19 +176,8 @@ def main():
             elif event.type == pygame.MOUSEBUTTONUP:
                 mouse_down = False
 
-        if last_dead_clearout + last_dead_clearout_interval < game_ticks:
-
-            last_dead_clearout = game_ticks
-
-            _ = len(entities)
-            entities = list(filter(GameEntities.Entity.entity_is_not_dead, entities))
-
-            print(f"Cleared out dead entities: {_ - len(entities)}")
-
         particle_count = len(square_effect.particles) + len(circle_effect.particles)
         hud_str = f"FPS: {clock.get_fps():.0f} HP: {player.hp} Particles: {particle_count}"
-        text = GA.Fonts.FONT_CONSOLAS.render(hud_str, True, (255, 255, 255))
-        text_rect = text.get_rect(x=0, y=0)
 
         GAME_WINDOW.fill((0, 0, 0))
         GAME_WINDOW.blit(GA.Sprites.BACKGROUND1_SPRITE, GA.Sprites.BACKGROUND1_RECT)
@@ -188,18 +188,16 @@ def main():
         square_effect.create_particle_on_chance(1/50)
         square_effect.render(GAME_WINDOW)
 
-        GAME_WINDOW.blit(text, text_rect)
+        GA.Fonts.TEXT_CACHE.blit(GAME_WINDOW, hud_str, 0, 0)
 
 
         # if keys[pygame.K_g]:
         #     e = get_enemy(True, *pygame.mouse.get_pos())
-        #     if e:
-        #         entities.append(e)
+        #     entities.add(e)
 
         # if keys[pygame.K_h]:
         #     e = get_enemy(False, *pygame.mouse.get_pos())
-        #     if e:
-        #         entities.append(e)
+        #     entities.add(e)
 
         # if keys[pygame.K_k]:
         #     spawn_circle(circle_effect)
@@ -218,18 +216,22 @@ def main():
         player.perform_task()
         player.render(GAME_WINDOW)
 
-        for entity in filter(GameEntities.Entity.entity_is_not_dead, entities):
+        # every player bullet against every entity hitbox at once, the bullets near each entity come back lowest slot first
+        bullet_hits = player.bullets.get_hits([entity.hitbox for entity in entities])
+
+        for entity, hits in zip(entities, bullet_hits):
 
             if keys[pygame.K_j]:
                 entity.move_towards(*pygame.mouse.get_pos())
 
-            bullet = player.get_bullet_collided_with(entity)
+            # a bullet can die on an earlier entity this frame
+            bullet = player.bullets.get_first_alive(hits)
 
-            if bullet:
+            if bullet is not None:
 
-                bullet.take_damage_no_i_frames(entity.get_entity_damage())
+                player.bullets.take_damage(bullet, entity.get_entity_damage())
 
-                if entity.take_damage_and_died(bullet.get_entity_damage()):
+                if entity.take_damage_and_died(player.bullets.damage[bullet]):
 
                     circle_effect.create_many_in_bounds(
                         3, entity.x - entity.width // 2, entity.y - entity.height // 2, entity.width, entity.height
@@ -254,4 +256,7 @@ def main():
 
                     create_player_death_explosion(circle_effect, square_effect, player)
 
+        # the entities that died this frame are gone before the next one
+        entities.remove_dead()
+
         circle_effect.render(GAME_WINDOW)
@@ -0,0 +1,291 @@
+import sys
+
+if __package__ is None and not hasattr(sys, "frozen"):
+    # direct call of __main__.py
+    import os.path
+
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.realpath(path))
+
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+
+"""
+Headless benchmarks for the game effects, prints the results as json
+
+    python -m AppleWorm.benchmark fog --frames 300
+    python -m AppleWorm.benchmark particles --count 10000
+    python -m AppleWorm.benchmark particles --count 10000 --frames 1 --burst
+"""
+
+
+class SurfaceCounter:
+    """
+    counts the pixel bytes of every surface made by pygame.Surface or a pygame.transform function while active
+
+    surface pixels are allocated by SDL, so tracemalloc does not see them
+    """
+
+    TRANSFORMS = ("flip", "rotate", "scale", "smoothscale")
+
+    def __init__(self) -> None:
+
+        self.surfaces = 0
+        self.bytes = 0
+        self.originals = {}
+
+    def count(self, surface):
+
+        self.surfaces += 1
+        self.bytes += surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def __enter__(self):
+
+        import pygame
+
+        counter = self
+
+        class CountedSurface(pygame.Surface):
+            def __init__(self, *args, **kwargs) -> None:
+                super().__init__(*args, **kwargs)
+                counter.count(self)
+
+        def counted(transform):
+            def wrapper(surface, *args, **kwargs):
+
+                result = transform(surface, *args, **kwargs)
+
+                # a transform into a given dest_surface makes nothing new
+                if not any(result is arg for arg in args + tuple(kwargs.values())):
+                    counter.count(result)
+
+                return result
+
+            return wrapper
+
+        self.originals["Surface"] = pygame.Surface
+        pygame.Surface = CountedSurface
+
+        for name in self.TRANSFORMS:
+            self.originals[name] = getattr(pygame.transform, name)
+            setattr(pygame.transform, name, counted(self.originals[name]))
+
+        return self
+
+    def __exit__(self, *exc):
+
+        import pygame
+
+        pygame.Surface = self.originals.pop("Surface")
+
+        for name in self.TRANSFORMS:
+            setattr(pygame.transform, name, self.originals.pop(name))
+
+
+def bench_fog_mode(DRAW_SURFACE, frames: int, scratch: bool, frame_cache: bool, cache_mb: float = None):
+
+    import pygame
+    from AppleWorm import GameParticles
+
+    fog = GameParticles.BorderFog()
+    fog.use_scratch_surfaces = scratch
+    fog.use_frame_cache = frame_cache
+
+    if cache_mb is not None:
+        fog.cache_max_bytes = int(cache_mb * 1024 * 1024)
+
+    # warm up, the scratch surfaces are made on the first frame
+    fog.render(DRAW_SURFACE)
+
+    tracemalloc.start()
+    python_peak = 0
+    changed_frames = 0
+    last_frame = None
+
+    with SurfaceCounter() as surfaces:
+
+        start = time.perf_counter()
+
+        for _ in range(frames):
+
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+
+            fog.update()
+            fog.render(DRAW_SURFACE)
+
+            python_peak += tracemalloc.get_traced_memory()[1] - before
+
+        total = time.perf_counter() - start
+
+    tracemalloc.stop()
+
+    # the frames are compared after the measuring, so all of them are drawn again
+    for _ in range(frames):
+
+        fog.update()
+        fog.render(DRAW_SURFACE)
+
+        frame = pygame.image.tobytes(DRAW_SURFACE, "RGB")
+        changed_frames += frame != last_frame
+        last_frame = frame
+
+    return {
+        "scratch_surfaces": scratch,
+        "frame_cache": frame_cache,
+        "frame_ms": total / frames * 1000,
+        # pixel memory of the surfaces made every frame, the churn of the old render path
+        "surface_bytes_per_frame": surfaces.bytes / frames,
+        "surfaces_per_frame": surfaces.surfaces / frames,
+        # the most python memory held at once during a frame, numpy views, point tuples and the like
+        "python_peak_bytes_per_frame": python_peak / frames,
+        # below 1 the effect stutters, a frame cache with phases coarser than an update repeats frames
+        "changed_frame_fraction": changed_frames / frames,
+        "frame_cache_bytes": fog.frame_cache_bytes,
+        "frame_cache_phases": len(fog.frame_cache),
+        "final_frame": pygame.surfarray.array3d(DRAW_SURFACE).astype(int),
+    }
+
+
+def bench_fog(width: int, height: int, frames: int, cache_mb: float = None):
+    """BorderFog.render making new surfaces every frame, against the scratch surfaces and the frame cache"""
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    import pygame
+
+    pygame.init()
+
+    DRAW_SURFACE = pygame.display.set_mode((width, height))
+
+    modes = [
+        bench_fog_mode(DRAW_SURFACE, frames, False, False),
+        bench_fog_mode(DRAW_SURFACE, frames, True, False),
+        bench_fog_mode(DRAW_SURFACE, frames, True, True, cache_mb),
+    ]
+
+    pygame.quit()
+
+    before = modes[0]["final_frame"]
+
+    for mode in modes:
+        # the most any color of the last frame is off from making new surfaces,
+        # the frame cache draws the start of the phase, which moves the edges of the fog past the first loop
+        diff = abs(mode.pop("final_frame") - before).max(axis=2)
+
+        mode["max_color_diff_vs_before"] = int(diff.max())
+        mode["diff_pixel_fraction_vs_before"] = float((diff > 0).mean())
+
+    return {"width": width, "height": height, "frames": frames, "modes": modes}
+
+
+def bench_particles_mode(DRAW_SURFACE, effect_type, count: int, frames: int, seed: int, burst: bool, use_atlas: bool):
+
+    effect = effect_type(seed=seed)
+    effect.use_atlas = use_atlas
+
+    width, height = DRAW_SURFACE.get_size()
+    effect.create_many_in_bounds(count, 0, 0, width, height)
+
+    # warm up, the atlas sprites of the first frame are rendered here
+    effect.draw(DRAW_SURFACE)
+
+    total = 0
+    particles = 0
+
+    for _ in range(frames):
+
+        # only draw is timed, the update, the top up and the clear are the same for both modes
+        effect.update()
+
+        if not burst:
+            effect.create_many_in_bounds(count - len(effect.particles), 0, 0, width, height)
+
+        DRAW_SURFACE.fill((0, 0, 0))
+        particles += len(effect.particles)
+
+        start = time.perf_counter()
+        effect.draw(DRAW_SURFACE)
+        total += time.perf_counter() - start
+
+    return {
+        "use_atlas": use_atlas,
+        "draw_ms": total / frames * 1000,
+        "particles_per_frame": particles / frames,
+        "atlas_sprites": len(effect.atlas.sprites),
+        "atlas_hits": effect.atlas.hits,
+        "atlas_misses": effect.atlas.misses,
+    }
+
+
+def bench_particles(width: int, height: int, count: int, frames: int, seed: int, burst: bool = False):
+    """ParticleEffect.draw with a pygame.draw call per particle, against the blits of the sprite atlas"""
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    import pygame
+    from AppleWorm import GameParticles
+
+    pygame.init()
+
+    DRAW_SURFACE = pygame.display.set_mode((width, height))
+
+    effects = {}
+
+    for effect_type in (GameParticles.FallingSquareEffect, GameParticles.ExpandingCircle):
+        # the same seed for both modes, so they draw the same particles
+        effects[effect_type.__name__] = [
+            bench_particles_mode(DRAW_SURFACE, effect_type, count, frames, seed, burst, False),
+            bench_particles_mode(DRAW_SURFACE, effect_type, count, frames, seed, burst, True),
+        ]
+
+    pygame.quit()
+
+    return {
+        "width": width,
+        "height": height,
+        "count": count,
+        "frames": frames,
+        "seed": seed,
+        "burst": burst,
+        "effects": effects,
+    }
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="headless effect benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fog = commands.add_parser("fog", help="time and allocations of BorderFog.render with the dummy video driver")
+    fog.add_argument("--width", type=int, default=1324)
+    fog.add_argument("--height", type=int, default=1000)
+    fog.add_argument("--frames", type=int, default=300)
+    fog.add_argument("--cache-mb", type=float, help="cache_max_bytes of the frame cache, in MB")
+
+    particles = commands.add_parser("particles", help="time of ParticleEffect.draw with and without the sprite atlas")
+    particles.add_argument("--width", type=int, default=1324)
+    particles.add_argument("--height", type=int, default=1000)
+    particles.add_argument("--count", type=int, default=10000, help="live particles, the dead ones are replaced every frame")
+    particles.add_argument("--burst", action="store_true", help="spawn count once and let them die instead of replacing them")
+    particles.add_argument("--frames", type=int, default=60)
+    particles.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "fog":
+        results = bench_fog(args.width, args.height, args.frames, args.cache_mb)
+
+    elif args.command == "particles":
+        results = bench_particles(args.width, args.height, args.count, args.frames, args.seed, args.burst)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+class FrameTimeController:
+    """
+    a load level picked from measured frame times to hold a target fps, 0 is full quality and max_level the cheapest
+
+    feed update the seconds of work of every frame, without the sleep of the frame cap,
+    the level goes up while the frames are over budget and back down once they take less than headroom of it,
+    in between the level is left alone so it does not flip back and forth every settle_frames
+    """
+
+    def __init__(self, target_fps: float = 60, max_level: int = 7, headroom: float = 0.7, settle_frames: int = 15) -> None:
+
+        self.target_fps = target_fps
+        self.max_level = max_level
+
+        # only go back to a lower level when the frames take less than this part of the budget
+        self.headroom = headroom
+
+        # frames to wait after a change so the average catches up before changing again
+        self.settle_frames = settle_frames
+
+        self.level = 0
+        self.frame_time = None
+        self.frames_since_change = 0
+
+        # "full" at level 0, "reduced" above that, "over budget" at max_level and still too slow
+        self.state = "full"
+
+    def update(self, frame_time: float):
+        """returns the level for the next frame"""
+
+        # smoothed so a single slow frame does not change the level
+        if self.frame_time is None:
+            self.frame_time = frame_time
+        else:
+            self.frame_time += (frame_time - self.frame_time) * 0.1
+
+        self.frames_since_change += 1
+
+        budget = 1 / self.target_fps
+
+        if self.frames_since_change >= self.settle_frames:
+
+            if self.frame_time > budget and self.level < self.max_level:
+                self.level += 1
+                self.frames_since_change = 0
+
+            elif self.frame_time < budget * self.headroom and self.level > 0:
+                self.level -= 1
+                self.frames_since_change = 0
+
+        if self.level == 0:
+            self.state = "full"
+        elif self.level == self.max_level and self.frame_time > budget:
+            self.state = "over budget"
+        else:
+            self.state = "reduced"
+
+        return self.level
@@ -0,0 +1,170 @@
+import pygame
+import re
+from collections import OrderedDict
+
+
+class TextCache:
+    """
+    rendered text surfaces of one font and color, so unchanged text is not rasterized again every frame
+
+    the characters in glyphs are pre-rendered into an atlas once, text with changing numbers like the fps
+    is put together from the atlas and the cached rest of the text instead of being rendered.
+    text is only cached the second time it is drawn, a number that changes every frame is drawn glyph by glyph.
+    everything is kept with premultiplied alpha, which blits a lot faster than plain per pixel alpha.
+    pygame versions without Surface.premul_alpha get plain per pixel alpha surfaces instead
+    """
+
+    def __init__(self, font: pygame.font.Font, color=(255, 255, 255), max_size: int = 128, glyphs: str = "0123456789"):
+
+        self.font = font
+        self.color = color
+
+        # how the surfaces are blit, premul_alpha is still experimental and missing from older pygame versions
+        self.premultiplied = hasattr(pygame.Surface, "premul_alpha")
+        self.blend = pygame.BLEND_PREMULTIPLIED if self.premultiplied else 0
+
+        # text -> surface, least recently used first
+        self.max_size = max_size
+        self.cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # text drawn once but not cached yet
+        self.seen: OrderedDict = OrderedDict()
+
+        # splits text into [text, glyphs, text, glyphs, ..., text]
+        self.split = re.compile(f"([{re.escape(glyphs)}]+)").split
+
+        # every glyph side by side in one surface, with the area of each
+        rendered = [self.render(glyph) for glyph in glyphs]
+
+        self.atlas = pygame.Surface((sum(i.get_width() for i in rendered), font.get_height()), pygame.SRCALPHA)
+        self.glyphs = {}
+
+        x = 0
+
+        for glyph, surface in zip(glyphs, rendered):
+
+            self.atlas.blit(surface, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.glyphs[glyph] = pygame.Rect(x, 0, *surface.get_size())
+            x += surface.get_width()
+
+        # the glyphs of most fonts used for numbers all have the same whole pixel advance,
+        # then a run of them can be laid out without asking the font where each one goes
+        advance = font.size(glyphs[0])[0]
+
+        if all(font.size(glyph)[0] == advance for glyph in glyphs) and font.size(glyphs * 2)[0] == advance * len(glyphs) * 2:
+            self.advance = advance
+        else:
+            self.advance = None
+
+    def render(self, text: str):
+
+        rendered = self.font.render(text, True, self.color)
+
+        if not self.premultiplied:
+            return rendered
+
+        # premul_alpha garbles surfaces with padded rows like the ones from the font, so copy it into a plain one first
+        surface = pygame.Surface(rendered.get_size(), pygame.SRCALPHA)
+        surface.blit(rendered, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+
+        return surface.premul_alpha()
+
+    def get(self, text: str) -> pygame.Surface:
+        """the text as one surface, blit it with blend as the special_flags"""
+
+        surface = self.cache.get(text)
+
+        if surface is not None:
+            self.hits += 1
+            self.cache.move_to_end(text)
+            return surface
+
+        self.misses += 1
+
+        parts = self.split(text)
+
+        if len(parts) == 1:
+            surface = self.render(text)
+        else:
+            surface = self.compose(text, parts)
+
+        self.cache[text] = surface
+
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+        return surface
+
+    def compose(self, text: str, parts: list):
+        """puts the text back together from the atlas and the cached text between the glyphs"""
+
+        size = self.font.size
+
+        # advances are not always whole pixels and pairs can be kerned,
+        # so a piece goes where the font puts the character it starts with in the whole text
+        def get_x(i):
+            return size(text[: i + 1])[0] - size(text[i])[0]
+
+        blits = []
+        start = 0
+
+        for i, part in enumerate(parts):
+
+            if i % 2 and self.advance is not None:
+
+                x = get_x(start)
+
+                for glyph in part:
+                    blits.append((self.atlas, (x, 0), self.glyphs[glyph], pygame.BLEND_RGBA_MAX))
+                    x += self.advance
+
+            elif i % 2:
+                for j, glyph in enumerate(part):
+                    blits.append((self.atlas, (get_x(start + j), 0), self.glyphs[glyph], pygame.BLEND_RGBA_MAX))
+
+            elif part:
+                blits.append((self.get(part), (get_x(start), 0), None, pygame.BLEND_RGBA_MAX))
+
+            start += len(part)
+
+        # max against a transparent surface copies the pixels with their alpha instead of blending them
+        surface = pygame.Surface(size(text), pygame.SRCALPHA)
+        surface.blits(blits, False)
+
+        return surface
+
+    def blit(self, DRAW_SURFACE: pygame.Surface, text: str, x: int = 0, y: int = 0):
+
+        if text in self.cache or text in self.seen:
+            DRAW_SURFACE.blit(self.get(text), (x, y), None, self.blend)
+            return
+
+        self.seen[text] = None
+
+        while len(self.seen) > self.max_size:
+            self.seen.popitem(last=False)
+
+        parts = self.split(text)
+
+        # without a fixed advance the glyphs can not be placed without asking the font, rendering is cheaper then
+        if self.advance is None or len(parts) == 1:
+            DRAW_SURFACE.blit(self.font.render(text, True, self.color), (x, y))
+            return
+
+        blits = []
+
+        for i, part in enumerate(parts):
+
+            if i % 2:
+                for glyph in part:
+                    blits.append((self.atlas, (x, y), self.glyphs[glyph], self.blend))
+                    x += self.advance
+
+            elif part:
+                surface = self.get(part)
+                blits.append((surface, (x, y), None, self.blend))
+                x += surface.get_width()
+
+        DRAW_SURFACE.blits(blits, False)
@@ -0,0 +1,3 @@
+"""
+Helpers shared by the games in this repository
+"""
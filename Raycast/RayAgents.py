@@ -0,0 +1,180 @@
+import numpy as np
+import numpy.typing as npt
+
+import math
+
+from . import RayEngine
+
+
+"""
+A headless batch of cameras moved the same way Raycaster.input moves the player,
+without pygame, so many agents can be stepped at once from an array of actions.
+
+An action is a (move, turn) pair
+    move   1 forward (w), -1 backward (s), 0 stand still
+    turn   1 left (a), -1 right (d), 0 keep looking ahead
+
+Given the same start and actions the agents end up exactly where Raycaster.input would put them.
+"""
+
+
+MOVE_FORWARD = 1
+MOVE_BACKWARD = -1
+TURN_LEFT = 1
+TURN_RIGHT = -1
+
+# every (move, turn) pair, so a discrete action index can be turned into actions with ACTIONS[index]
+ACTIONS = np.array(
+    [(move, turn) for move in (0, MOVE_FORWARD, MOVE_BACKWARD) for turn in (0, TURN_LEFT, TURN_RIGHT)], dtype=np.int8
+)
+
+
+class AgentEnvironment:
+    """n cameras in a room, stepped together with the movement and wall sliding of Raycaster.input"""
+
+    def __init__(
+        self, room: npt.NDArray, agents: int, seed: int = None, frame_time: float = 1 / 60, plane_length: float = 0.66
+    ) -> None:
+
+        self.room = room
+        self.agents = agents
+        self.frame_time = frame_time
+        self.plane_length = plane_length
+
+        self.rng = np.random.default_rng(seed)
+
+        self.pos_x = np.zeros(agents)
+        self.pos_y = np.zeros(agents)
+        self.dir_x = np.zeros(agents)
+        self.dir_y = np.zeros(agents)
+        self.plane_x = np.zeros(agents)
+        self.plane_y = np.zeros(agents)
+
+        # scratch for step, all the math is done in place
+        self.scratch = np.empty((4, agents))
+        self.cells = np.empty(agents, dtype=np.intp)
+        self.moved = np.empty(agents, dtype=bool)
+
+        self.steps = 0
+
+        self.reset()
+
+    def reset(self, seed: int = None):
+        """puts every agent in a random empty cell looking in a random direction"""
+
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        empty = np.flatnonzero(np.asarray(self.room).ravel() == 0)
+
+        if not len(empty):
+            raise ValueError("the room has no empty cells to put the agents in")
+
+        cells = empty[self.rng.integers(len(empty), size=self.agents)]
+        cell_x, cell_y = np.divmod(cells, self.room.shape[1])
+
+        # keep clear of the cell edges, int() of the position has to be the empty cell
+        offset = self.rng.uniform(0.1, 0.9, size=(2, self.agents))
+
+        self.pos_x[:] = cell_x + offset[0]
+        self.pos_y[:] = cell_y + offset[1]
+
+        angle = self.rng.uniform(0, 2 * math.pi, size=self.agents)
+
+        self.set_direction(np.cos(angle), np.sin(angle))
+
+        self.steps = 0
+
+    def set_direction(self, dir_x: npt.NDArray, dir_y: npt.NDArray):
+        """points the agents along the given directions, the plane is turned 90 degrees clockwise like Raycaster"""
+
+        self.dir_x[:] = dir_x
+        self.dir_y[:] = dir_y
+
+        self.plane_x[:] = self.dir_y * self.plane_length
+        self.plane_y[:] = -self.dir_x * self.plane_length
+
+    def step(self, actions: npt.NDArray, frame_time: float = None):
+        """moves every agent by its (move, turn) action, actions is an (agents, 2) array"""
+
+        if frame_time is None:
+            frame_time = self.frame_time
+
+        actions = np.asarray(actions)
+        move = actions[:, 0]
+        turn = actions[:, 1]
+
+        move_speed = frame_time * 5.0
+        rot_speed = frame_time * 3.0
+
+        cos, sin, old, step = self.scratch
+
+        # turning, cos / sin are the same scalar math.cos / math.sin as Raycaster.input
+        # so the rotation is bit for bit the same, agents that do not turn rotate by cos 1 and sin 0
+        cos.fill(1.0)
+        np.copyto(cos, math.cos(rot_speed), where=turn != 0)
+        np.multiply(turn, math.sin(rot_speed), out=sin)
+
+        self.rotate(self.dir_x, self.dir_y, cos, sin, old, step)
+        self.rotate(self.plane_x, self.plane_y, cos, sin, old, step)
+
+        # moving, the x and y steps are checked on their own so agents slide along walls
+        flat_room = np.asarray(self.room).ravel()
+        height = self.room.shape[1]
+
+        # x first, checked against the cell at the old y
+        np.multiply(self.dir_x, move_speed, out=step)
+        step *= move
+        np.add(self.pos_x, step, out=old)
+        self.try_move(flat_room, height, old, self.pos_y, self.pos_x, step)
+
+        # then y, checked against the cell at the new x
+        np.multiply(self.dir_y, move_speed, out=step)
+        step *= move
+        np.add(self.pos_y, step, out=old)
+        self.try_move(flat_room, height, self.pos_x, old, self.pos_y, step)
+
+        self.steps += 1
+
+    def rotate(
+        self, x: npt.NDArray, y: npt.NDArray, cos: npt.NDArray, sin: npt.NDArray, old: npt.NDArray, tmp: npt.NDArray
+    ):
+        """rotates the vectors in place, x = x * cos - y * sin and y = old_x * sin + y * cos"""
+
+        old[:] = x
+
+        x *= cos
+        np.multiply(y, sin, out=tmp)
+        x -= tmp
+
+        y *= cos
+        np.multiply(old, sin, out=tmp)
+        y += tmp
+
+    def try_move(
+        self, flat_room: npt.NDArray, height: int, x: npt.NDArray, y: npt.NDArray, pos: npt.NDArray, step: npt.NDArray
+    ):
+        """adds step to pos where the cell at (x, y) is empty"""
+
+        # the positions are never negative, so truncating is the same as int()
+        np.multiply(x.astype(np.intp), height, out=self.cells)
+        self.cells += y.astype(np.intp)
+
+        np.equal(flat_room.take(self.cells), 0, out=self.moved)
+
+        step *= self.moved
+        pos += step
+
+    def get_pose(self):
+        """returns the (agents, 2) positions, directions and planes"""
+
+        return (
+            np.stack((self.pos_x, self.pos_y), axis=1),
+            np.stack((self.dir_x, self.dir_y), axis=1),
+            np.stack((self.plane_x, self.plane_y), axis=1),
+        )
+
+    def cast(self, columns: int = 64, skip_field: RayEngine.SkipField = None) -> RayEngine.RayHits:
+        """what every agent sees, the (agents, columns) hits of RayEngine.cast_views"""
+
+        return RayEngine.cast_views(self.room, *self.get_pose(), columns=columns, skip_field=skip_field)
@@ -0,0 +1,528 @@
+import numpy as np
+import numpy.typing as npt
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from . import RayRoom
+
+
+"""
+Vectorized version of the DDA in Raycaster.render
+
+Every ray is stepped in lock-step as numpy arrays, rays that hit a wall are
+written out and dropped from the working set so the loop only runs as long as the longest ray
+
+check_line_of_sight and query_rays reuse the same DDA for visibility checks that are not screen columns
+"""
+
+
+class RayHits(NamedTuple):
+
+    perp_wall_dist: npt.NDArray
+    side: npt.NDArray
+    map_value: npt.NDArray
+    map_x: npt.NDArray
+    map_y: npt.NDArray
+
+
+class RayQuery(NamedTuple):
+
+    hit: npt.NDArray
+    distance: npt.NDArray
+    map_x: npt.NDArray
+    map_y: npt.NDArray
+
+
+def get_camera_rays(dir_x, dir_y, plane_x, plane_y, w: int, x_start: int = 0, x_end: int = None):
+    """returns the ray directions of the screen columns x_start to x_end, same math as the scalar render"""
+
+    if x_end is None:
+        x_end = w
+
+    x = np.arange(x_start, x_end)
+
+    camera_x = 2 * x / w - 1  # x coordinate in camera space
+
+    ray_dir_x = dir_x + plane_x * camera_x
+    ray_dir_y = dir_y + plane_y * camera_x
+
+    return ray_dir_x, ray_dir_y
+
+
+def cast_rays(
+    room: npt.NDArray,
+    pos_x,
+    pos_y,
+    ray_dir_x: npt.NDArray,
+    ray_dir_y: npt.NDArray,
+    skip_field: "SkipField" = None,
+    max_distance=None,
+) -> RayHits:
+    """
+    casts every ray from (pos_x, pos_y) until it hits a non zero cell of the room
+
+    with max_distance, in multiples of the ray direction, rays that would have to enter a cell at or past it stop
+    and miss, a miss has a map_value of 0, side -1, the max_distance as distance and the cell the ray stopped in
+    """
+
+    limited = max_distance is not None
+
+    ray_dir_x, ray_dir_y, pos_x, pos_y, max_distance = np.broadcast_arrays(
+        np.asarray(ray_dir_x, dtype=np.float64),
+        np.asarray(ray_dir_y, dtype=np.float64),
+        np.asarray(pos_x, dtype=np.float64),
+        np.asarray(pos_y, dtype=np.float64),
+        np.asarray(max_distance if limited else 0, dtype=np.float64),
+    )
+
+    shape = ray_dir_x.shape
+
+    ray_dir_x = ray_dir_x.ravel()
+    ray_dir_y = ray_dir_y.ravel()
+    pos_x = pos_x.ravel()
+    pos_y = pos_y.ravel()
+    max_distance = max_distance.ravel()
+
+    with np.errstate(divide="ignore"):
+        delta_dist_x = np.where(ray_dir_x == 0, 1e30, np.abs(1 / ray_dir_x))
+        delta_dist_y = np.where(ray_dir_y == 0, 1e30, np.abs(1 / ray_dir_y))
+
+    # int() truncates towards zero, so does astype
+    map_x = pos_x.astype(np.int64)
+    map_y = pos_y.astype(np.int64)
+
+    step_x = np.where(ray_dir_x < 0, -1, 1)
+    step_y = np.where(ray_dir_y < 0, -1, 1)
+
+    first_side_dist_x = np.where(ray_dir_x < 0, (pos_x - map_x) * delta_dist_x, (map_x + 1.0 - pos_x) * delta_dist_x)
+    first_side_dist_y = np.where(ray_dir_y < 0, (pos_y - map_y) * delta_dist_y, (map_y + 1.0 - pos_y) * delta_dist_y)
+
+    n = ray_dir_x.size
+
+    out_perp_wall_dist = np.zeros(n, dtype=np.float64)
+    out_side = np.zeros(n, dtype=np.int8)
+    out_map_value = np.zeros(n, dtype=room.dtype)
+    out_cell = np.zeros(n, dtype=np.int64)
+
+    # cells are looked up by their index into the flat room, room[map_x, map_y] builds a tuple index every step
+    height = room.shape[1]
+    flat_room = room.ravel()
+    flat_skip = skip_field.distance.ravel() if skip_field is not None else None
+
+    # the state of every ray that has not hit a wall yet, stacked so dropping finished rays is one take per dtype
+    rays_f = np.stack((first_side_dist_x, first_side_dist_y, delta_dist_x, delta_dist_y, max_distance)[: 4 + limited])
+    rays_i = np.stack(
+        (
+            np.zeros(n, dtype=np.int64),  # x grid lines crossed, side_dist_x = first_side_dist_x + steps_x * delta_dist_x
+            np.zeros(n, dtype=np.int64),  # y grid lines crossed
+            map_x * height + map_y,  # the cell the ray is in
+            step_x * height,  # how the cell changes with an x step
+            step_y,  # how the cell changes with a y step
+            np.arange(n),  # index into the output arrays
+        )
+    )
+
+    # rays that hit are frozen in place and only dropped from the state once they are half of it,
+    # dropping copies the whole state which costs more than masking for large batches
+    active = np.ones(n, dtype=bool)
+    finished = 0
+
+    while rays_i.shape[1]:
+
+        first_side_dist_x, first_side_dist_y, delta_dist_x, delta_dist_y = rays_f[:4]
+        steps_x, steps_y, cell, cell_step_x, cell_step_y, ray = rays_i
+
+        side_dist_x = first_side_dist_x + steps_x * delta_dist_x
+        side_dist_y = first_side_dist_y + steps_y * delta_dist_y
+
+        if limited:
+
+            # the next cell would be entered at or past the max distance, the ray missed
+            missed = np.minimum(side_dist_x, side_dist_y) >= rays_f[4]
+
+            if finished:
+                missed &= active
+
+            if missed.any():
+
+                missed_ray = ray[missed]
+
+                out_perp_wall_dist[missed_ray] = rays_f[4][missed]
+                out_side[missed_ray] = -1
+                out_cell[missed_ray] = cell[missed]
+
+                active &= ~missed
+                finished += missed_ray.size
+
+        # jump to the next square in either x or y direction
+        step_in_x = side_dist_x < side_dist_y
+
+        take_x = step_in_x.astype(np.int64)
+        take_y = 1 - take_x
+
+        if skip_field is not None:
+            skip_field.get_jumps(
+                flat_skip.take(cell),
+                first_side_dist_x,
+                first_side_dist_y,
+                steps_x,
+                steps_y,
+                delta_dist_x,
+                delta_dist_y,
+                take_x,
+                take_y,
+                rays_f[4] if limited else None,
+            )
+
+        if finished:
+            take_x *= active
+            take_y *= active
+
+        steps_x += take_x
+        steps_y += take_y
+
+        cell += cell_step_x * take_x
+        cell += cell_step_y * take_y
+
+        map_value = flat_room.take(cell)
+
+        # a jump always lands on an empty cell, so a hit is always from a single step
+        hit = map_value > 0
+
+        if finished:
+            hit &= active
+
+        if not hit.any():
+
+            if limited and finished:
+                rays_f, rays_i, active, finished = compact_rays(rays_f, rays_i, active, finished)
+
+            continue
+
+        hit_ray = ray[hit]
+
+        # prevent the fish eye effect by not using the euclidean distance
+        out_perp_wall_dist[hit_ray] = np.where(
+            step_in_x[hit],
+            first_side_dist_x[hit] + steps_x[hit] * delta_dist_x[hit] - delta_dist_x[hit],
+            first_side_dist_y[hit] + steps_y[hit] * delta_dist_y[hit] - delta_dist_y[hit],
+        )
+        out_side[hit_ray] = ~step_in_x[hit]
+        out_map_value[hit_ray] = map_value[hit]
+        out_cell[hit_ray] = cell[hit]
+
+        active &= ~hit
+        finished += hit_ray.size
+
+        rays_f, rays_i, active, finished = compact_rays(rays_f, rays_i, active, finished)
+
+    out_map_x, out_map_y = np.divmod(out_cell, height)
+
+    return RayHits(
+        out_perp_wall_dist.reshape(shape),
+        out_side.reshape(shape),
+        out_map_value.reshape(shape),
+        out_map_x.reshape(shape),
+        out_map_y.reshape(shape),
+    )
+
+
+def compact_rays(rays_f: npt.NDArray, rays_i: npt.NDArray, active: npt.NDArray, finished: int):
+    """drops the finished rays from the cast_rays state once enough of them are done"""
+
+    # small sets are cheaper to drop right away than to keep masking
+    if finished * 2 < active.size and active.size > 4096:
+        return rays_f, rays_i, active, finished
+
+    keep = np.flatnonzero(active)
+
+    return rays_f.take(keep, axis=1), rays_i.take(keep, axis=1), np.ones(keep.size, dtype=bool), 0
+
+
+class SkipField:
+    """
+    distance to the nearest wall of every cell, lets rays jump over open space
+
+    a cell with distance d has no walls within d - 1 cells of it in any direction (chebyshev distance),
+    so a ray inside it can cross d - 1 more x lines and d - 1 more y lines without a hit check
+    """
+
+    def __init__(self, room: npt.NDArray, max_skip: int = 16) -> None:
+
+        self.max_skip = max_skip
+        self.distance = self.compute(room)
+
+    def compute(self, room: npt.NDArray):
+        """the distance of every cell of room, anything outside of room counts as a wall"""
+
+        level = np.asarray(room) == 0
+        distance = level.astype(np.uint8)
+
+        for _ in range(self.max_skip - 1):
+
+            # erode by one cell in every direction, separable in x then y
+            padded = np.pad(level, 1)
+            level = padded[:-2, 1:-1] & padded[1:-1, 1:-1] & padded[2:, 1:-1]
+
+            padded = np.pad(level, 1)
+            level = padded[1:-1, :-2] & padded[1:-1, 1:-1] & padded[1:-1, 2:]
+
+            if not level.any():
+                break
+
+            distance += level
+
+        return distance
+
+    def update_cell(self, room: npt.NDArray, x: int, y: int):
+        """recomputes only the cells whose distance can change after room[x, y] was edited"""
+
+        reach = self.max_skip - 1
+        width, height = self.distance.shape
+
+        # the distances that can change
+        x1, x2 = max(x - reach, 0), min(x + reach + 1, width)
+        y1, y2 = max(y - reach, 0), min(y + reach + 1, height)
+
+        # the cells those distances depend on
+        bx1, bx2 = max(x1 - reach, 0), min(x2 + reach, width)
+        by1, by2 = max(y1 - reach, 0), min(y2 + reach, height)
+
+        block = self.compute(room[bx1:bx2, by1:by2])
+
+        self.distance[x1:x2, y1:y2] = block[x1 - bx1:x2 - bx1, y1 - by1:y2 - by1]
+
+    def get_jumps(
+        self,
+        distance,
+        first_side_dist_x,
+        first_side_dist_y,
+        steps_x,
+        steps_y,
+        delta_dist_x,
+        delta_dist_y,
+        take_x,
+        take_y,
+        max_distance=None,
+    ):
+        """
+        overwrites take_x / take_y with the number of lines to cross for rays that can jump, distance is of the cell of each ray
+        and max_distance, when given, is how far each ray may go
+
+        every crossing before the first one that could leave the empty square around the ray is taken,
+        the crossings use the same first_side_dist + steps * delta_dist as single steps so the result is identical
+        """
+
+        reach = distance.astype(np.int64) - 1
+
+        jump = np.flatnonzero(reach > 0)
+
+        if not jump.size:
+            return
+
+        reach = reach[jump]
+        first_x, first_y = first_side_dist_x[jump], first_side_dist_y[jump]
+        steps_x, steps_y = steps_x[jump], steps_y[jump]
+        delta_x, delta_y = delta_dist_x[jump], delta_dist_y[jump]
+
+        limit = np.minimum(first_x + (steps_x + reach) * delta_x, first_y + (steps_y + reach) * delta_y)
+
+        # never jump past the end of the ray, it has to stop in the same cell single steps would
+        if max_distance is not None:
+            np.minimum(limit, max_distance[jump], out=limit)
+
+        take_x[jump] = self.count_crossings(first_x, steps_x, delta_x, reach, limit)
+        take_y[jump] = self.count_crossings(first_y, steps_y, delta_y, reach, limit)
+
+    @staticmethod
+    def count_crossings(first_side_dist, steps, delta_dist, reach, limit):
+        """the number of crossings from steps on with first_side_dist + i * delta_dist < limit, at most reach"""
+
+        # every value is finite, an axis the ray never crosses has a delta_dist of 1e30
+        count = np.ceil((limit - first_side_dist) / delta_dist).astype(np.int64) - steps
+        count = np.clip(count, 0, reach)
+
+        # the estimate can be off by rounding, fix it against the exact crossing values
+        while True:
+
+            under = (count < reach) & (first_side_dist + (steps + count) * delta_dist < limit)
+            over = (count > 0) & (first_side_dist + (steps + count - 1) * delta_dist >= limit)
+
+            if not under.any() and not over.any():
+                return count
+
+            count += under
+            count -= over
+
+
+def cast_columns(
+    room: npt.NDArray, pos_x, pos_y, dir_x, dir_y, plane_x, plane_y, w: int, skip_field: SkipField = None
+) -> RayHits:
+    """casts one ray per screen column, the vectorized version of the loop in Raycaster.render"""
+
+    ray_dir_x, ray_dir_y = get_camera_rays(dir_x, dir_y, plane_x, plane_y, w)
+
+    return cast_rays(room, pos_x, pos_y, ray_dir_x, ray_dir_y, skip_field)
+
+
+def cast_views(
+    room: npt.NDArray,
+    pos: npt.NDArray,
+    dir: npt.NDArray,
+    plane: npt.NDArray = None,
+    columns: int = 64,
+    skip_field: SkipField = None,
+    plane_length: float = 0.66,
+) -> RayHits:
+    """
+    casts the screen columns of many cameras at once, pos, dir and plane are (n, 2) arrays
+
+    every field of the returned RayHits is (n, columns), map_x / map_y are the cells that were hit.
+    when plane is None it is dir turned 90 degrees clockwise and scaled to plane_length, like the Raycaster default
+    """
+
+    pos = np.asarray(pos, dtype=np.float64).reshape(-1, 2)
+    dir = np.asarray(dir, dtype=np.float64).reshape(-1, 2)
+
+    if plane is None:
+        plane = np.stack((dir[:, 1], -dir[:, 0]), axis=1) * plane_length
+    else:
+        plane = np.asarray(plane, dtype=np.float64).reshape(-1, 2)
+
+    ray_dir_x, ray_dir_y = get_camera_rays(dir[:, 0, None], dir[:, 1, None], plane[:, 0, None], plane[:, 1, None], columns)
+
+    return cast_rays(room, pos[:, 0, None], pos[:, 1, None], ray_dir_x, ray_dir_y, skip_field)
+
+
+def check_line_of_sight(room: npt.NDArray, origin: npt.NDArray, target: npt.NDArray, skip_field: SkipField = None) -> RayQuery:
+    """
+    checks if anything blocks the lines from origin to target, both (n, 2) arrays of room coordinates
+
+    hit is True where a wall is in the way, map_x / map_y is the blocking cell and distance how far along the line it is.
+    where nothing blocks the cell is the one of the target and the distance the length of the line
+    """
+
+    origin = np.asarray(origin, dtype=np.float64).reshape(-1, 2)
+    target = np.asarray(target, dtype=np.float64).reshape(-1, 2)
+
+    line = target - origin
+
+    # the direction is the whole line, so the line ends at a distance of 1
+    hits = cast_rays(room, origin[:, 0], origin[:, 1], line[:, 0], line[:, 1], skip_field, 1.0)
+
+    return RayQuery(hits.side >= 0, hits.perp_wall_dist * np.hypot(line[:, 0], line[:, 1]), hits.map_x, hits.map_y)
+
+
+def query_rays(
+    room: npt.NDArray, origin: npt.NDArray, direction: npt.NDArray, max_distance=None, skip_field: SkipField = None
+) -> RayQuery:
+    """
+    casts rays from origin along direction, both (n, 2) arrays, and finds the first wall within max_distance
+
+    max_distance is a scalar or one per ray, None casts until a wall is hit.
+    distance is the euclidean distance to where the ray enters the wall cell, or max_distance for rays that miss.
+    raises ValueError for a zero or non-finite direction, it has no ray to cast
+    """
+
+    origin = np.asarray(origin, dtype=np.float64).reshape(-1, 2)
+    direction = np.asarray(direction, dtype=np.float64).reshape(-1, 2)
+
+    length = np.hypot(direction[:, 0], direction[:, 1])
+
+    if not np.all(np.isfinite(length) & (length > 0)):
+        raise ValueError("ray directions must be finite and not zero")
+
+    # with unit directions the perpendicular distance of the DDA is the euclidean distance
+    direction = direction / length[:, None]
+
+    hits = cast_rays(room, origin[:, 0], origin[:, 1], direction[:, 0], direction[:, 1], skip_field, max_distance)
+
+    return RayQuery(hits.side >= 0, hits.perp_wall_dist, hits.map_x, hits.map_y)
+
+
+# the room of a StripCaster worker process, sent once when the worker starts
+_worker_room: npt.NDArray = None
+_worker_skip_field: SkipField = None
+
+
+def _init_strip_worker(room: npt.NDArray, room_path: str, skip_field: SkipField):
+
+    global _worker_room, _worker_skip_field
+
+    if room_path is not None:
+        room = RayRoom.open_room(room_path)
+
+    _worker_room = room
+    _worker_room.flags.writeable = False
+    _worker_skip_field = skip_field
+
+
+def _cast_strip(pos_x, pos_y, dir_x, dir_y, plane_x, plane_y, w: int, x_start: int, x_end: int):
+
+    ray_dir_x, ray_dir_y = get_camera_rays(dir_x, dir_y, plane_x, plane_y, w, x_start, x_end)
+
+    return cast_rays(_worker_room, pos_x, pos_y, ray_dir_x, ray_dir_y, _worker_skip_field)
+
+
+class StripCaster:
+    """casts the screen columns in strips on a pool of worker processes"""
+
+    def __init__(
+        self, room: npt.NDArray, workers: int = None, strips_per_worker: int = 2, skip_field: SkipField = None
+    ) -> None:
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        self.workers = workers
+        self.strips = workers * strips_per_worker
+
+        # memory mapped rooms are opened again by each worker instead of being copied to it
+        if isinstance(room, np.memmap) and room.filename is not None:
+            initargs = (None, room.filename, skip_field)
+        else:
+            initargs = (room, None, skip_field)
+
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_strip_worker, initargs=initargs)
+
+        self.room_dtype = room.dtype
+        self.hits: RayHits = None
+
+    def close(self):
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_buffer(self, w: int):
+        """the merged per column buffer, reused between frames with the same width"""
+
+        if self.hits is None or self.hits.perp_wall_dist.size != w:
+
+            self.hits = RayHits(
+                np.zeros(w, dtype=np.float64),
+                np.zeros(w, dtype=np.int8),
+                np.zeros(w, dtype=self.room_dtype),
+                np.zeros(w, dtype=np.int64),
+                np.zeros(w, dtype=np.int64),
+            )
+
+        return self.hits
+
+    def cast_columns(self, pos_x, pos_y, dir_x, dir_y, plane_x, plane_y, w: int) -> RayHits:
+
+        bounds = np.linspace(0, w, min(self.strips, w) + 1).astype(int)
+
+        futures = [
+            (x_start, x_end, self.executor.submit(_cast_strip, pos_x, pos_y, dir_x, dir_y, plane_x, plane_y, w, x_start, x_end))
+            for x_start, x_end in zip(bounds[:-1], bounds[1:])
+        ]
+
+        hits = self.get_buffer(w)
+
+        for x_start, x_end, future in futures:
+
+            for merged, strip in zip(hits, future.result()):
+                merged[x_start:x_end] = strip
+
+        return hits
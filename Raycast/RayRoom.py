@@ -0,0 +1,68 @@
+import numpy as np
+import numpy.typing as npt
+
+import struct
+
+
+"""
+Room files, a small header followed by the cells as uint8
+
+    magic   8 bytes   b"RAYROOM1"
+    width   uint32    little endian, room.shape[0]
+    height  uint32    little endian, room.shape[1]
+    cells   width * height bytes, room[x, y] is at x * height + y
+
+The cells are opened with np.memmap so only the pages a ray touches are read from disk,
+opening a 4096x4096 room costs the same as a 24x24 one.
+Like the built in room the border has to be walls, the DDA does not bounds check.
+"""
+
+
+ROOM_MAGIC = b"RAYROOM1"
+ROOM_HEADER = struct.Struct("<8sII")
+
+
+def read_room_header(path: str):
+    """returns the width and height of the room in the file"""
+
+    with open(path, "rb") as f:
+        magic, width, height = ROOM_HEADER.unpack(f.read(ROOM_HEADER.size))
+
+    if magic != ROOM_MAGIC:
+        raise ValueError(f"{path} is not a room file")
+
+    return width, height
+
+
+def open_room(path: str, mode: str = "r") -> np.memmap:
+    """memory maps the room in the file, use mode "r+" to be able to edit it"""
+
+    width, height = read_room_header(path)
+
+    return np.memmap(path, dtype=np.uint8, mode=mode, offset=ROOM_HEADER.size, shape=(width, height))
+
+
+def create_room(path: str, width: int, height: int) -> np.memmap:
+    """creates a room file of empty cells with walls around the border and maps it for writing"""
+
+    with open(path, "wb") as f:
+        f.write(ROOM_HEADER.pack(ROOM_MAGIC, width, height))
+
+        # the file is made sparse instead of writing every cell
+        f.truncate(ROOM_HEADER.size + width * height)
+
+    room = open_room(path, "r+")
+
+    room[0, :] = 1
+    room[-1, :] = 1
+    room[:, 0] = 1
+    room[:, -1] = 1
+
+    return room
+
+
+def save_room(path: str, room: npt.NDArray):
+
+    with open(path, "wb") as f:
+        f.write(ROOM_HEADER.pack(ROOM_MAGIC, *room.shape))
+        np.asarray(room, dtype=np.uint8).tofile(f)
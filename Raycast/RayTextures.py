@@ -0,0 +1,167 @@
+import numpy as np
+import numpy.typing as npt
+
+import pygame
+from collections import OrderedDict
+
+
+"""
+Textured walls for the framebuffer path of Raycaster, like the second part of
+ - https://lodev.org/cgtutor/raycasting.html
+
+Textures are (width, height, 3) arrays indexed [tex_x, tex_y] like surfarray,
+each one has a pre-shaded copy for side 1 walls so shading is an index instead of math per pixel.
+"""
+
+
+def generate_textures(size: int = 64):
+    """the procedural textures from the tutorial, returns an (8, size, size, 3) uint8 array"""
+
+    x, y = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+
+    xor_color = (x * 256 // size) ^ (y * 256 // size)
+    y_color = y * 256 // size
+    xy_color = y * 128 // size + x * 128 // size
+
+    zero = np.zeros_like(x)
+    red_cross = ((x != y) & (x != size - y - 1)) * 192
+
+    textures = np.stack(
+        (
+            np.stack((254 * (red_cross == 0), zero, zero), axis=-1) + np.stack((zero, red_cross, red_cross), axis=-1),
+            np.stack((xy_color, xy_color, xy_color), axis=-1),  # sloped greyscale
+            np.stack((xy_color, xy_color // 2, zero), axis=-1),  # sloped yellow gradient
+            np.stack((xor_color, xor_color, xor_color), axis=-1),  # xor greyscale
+            np.stack((zero, xor_color, zero), axis=-1),  # xor green
+            np.stack(((x % 16 != 0) & (y % 16 != 0), zero, zero), axis=-1) * 192 + 32,  # red bricks
+            np.stack((y_color, zero, zero), axis=-1),  # red gradient
+            np.full((size, size, 3), 128),  # flat grey
+        )
+    )
+
+    return np.clip(textures, 0, 255).astype(np.uint8)
+
+
+class WallTextures:
+    """the wall textures with their dark copies, and a cache of sampled screen columns"""
+
+    def __init__(self, textures: npt.NDArray = None, cache_size: int = 4096) -> None:
+
+        if textures is None:
+            textures = generate_textures()
+
+        self.count, self.tex_width, self.tex_height, _ = textures.shape
+
+        # index texture + side * count for the shaded version
+        self.textures = np.concatenate((textures, textures // 2))
+
+        # the textures mapped to the pixel format of the surface they are drawn on
+        self.mapped: npt.NDArray = None
+        self.mapped_format = None
+
+        # (texture, tex_x, line_height, screen height) -> sampled column of the screen height
+        self.cache_size = cache_size
+        self.cache: OrderedDict = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def map_to(self, surface: pygame.Surface):
+
+        surface_format = (surface.get_bitsize(), surface.get_masks(), surface.get_shifts())
+
+        if self.mapped_format == surface_format:
+            return
+
+        mapped = pygame.surfarray.map_array(surface, self.textures.reshape(-1, self.tex_height, 3))
+
+        self.mapped = mapped.astype(np.uint32).reshape(self.textures.shape[:3])
+        self.mapped_format = surface_format
+        self.cache.clear()
+
+    def get_tex_x(self, hits, pos_x, pos_y, ray_dir_x: npt.NDArray, ray_dir_y: npt.NDArray):
+        """the column of the texture every ray hits"""
+
+        # where exactly the wall was hit
+        wall_x = np.where(hits.side == 0, pos_y + hits.perp_wall_dist * ray_dir_y, pos_x + hits.perp_wall_dist * ray_dir_x)
+        wall_x -= np.floor(wall_x)
+
+        tex_x = (wall_x * self.tex_width).astype(np.int64)
+
+        flip = ((hits.side == 0) & (ray_dir_x > 0)) | ((hits.side == 1) & (ray_dir_y < 0))
+        tex_x[flip] = self.tex_width - tex_x[flip] - 1
+
+        return tex_x
+
+    def sample_columns(self, texture: npt.NDArray, tex_x: npt.NDArray, line_height: npt.NDArray, h: int):
+        """returns the (columns, h) mapped colors of every column, texture includes the side offset"""
+
+        keys = np.stack((texture, tex_x, line_height), axis=1)
+
+        # walls seen straight on repeat the same column a lot, only sample each one once
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+
+        columns = np.empty((len(unique), h), dtype=self.mapped.dtype)
+        missing = []
+
+        for i, key in enumerate(map(tuple, unique.tolist())):
+
+            column = self.cache.get(key + (h,))
+
+            if column is None:
+                missing.append(i)
+                continue
+
+            self.cache.move_to_end(key + (h,))
+            columns[i] = column
+
+        self.cache_hits += len(unique) - len(missing)
+        self.cache_misses += len(missing)
+
+        if missing:
+
+            missing = np.array(missing)
+            texture, tex_x, line_height = unique[missing].T
+
+            rows = np.arange(h)
+
+            # how far down the texture every row of the screen is, same as texPos in the tutorial
+            tex_y = ((rows - h / 2 + line_height[:, None] / 2) * self.tex_height / line_height[:, None]).astype(np.int64)
+            tex_y &= self.tex_height - 1
+
+            columns[missing] = self.mapped[texture[:, None], tex_x[:, None], tex_y]
+
+            for i in missing:
+                self.cache[tuple(unique[i].tolist()) + (h,)] = columns[i]
+
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        return columns[inverse.ravel()]
+
+    def get_floor_texels(self, pos_x, pos_y, ray_dir_x: npt.NDArray, ray_dir_y: npt.NDArray, h: int):
+        """
+        returns the flat texel index, tex_x * tex_height + tex_y, of every floor pixel below the horizon as (rows, columns)
+
+        the ceiling is the same rows mirrored, row y of the floor is row h - y - 1 of the ceiling
+        """
+
+        # the vertical position of the camera is half the screen
+        pos_z = 0.5 * h
+
+        # distance from the camera to the floor for every row below the horizon
+        p = np.arange(h // 2 + 1, h) - h // 2
+        row_distance = pos_z / p
+
+        # the real world coordinates of every pixel, the column rays are rayDir0 + floorStep * x of the tutorial
+        floor_x = pos_x + row_distance[:, None] * ray_dir_x
+        floor_y = pos_y + row_distance[:, None] * ray_dir_y
+
+        # the texture sizes are powers of 2, so for the positive coordinates of the room
+        # int(tex_width * floor_x) & (tex_width - 1) is exactly the tutorial's int(tex_width * (floor_x - cell_x))
+        floor_x *= self.tex_width
+        floor_y *= self.tex_height
+
+        tex_x = floor_x.astype(np.int32) & (self.tex_width - 1)
+        tex_y = floor_y.astype(np.int32) & (self.tex_height - 1)
+
+        return tex_x * self.tex_height + tex_y
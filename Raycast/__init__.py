@@ -3,8 +3,14 @@ import numpy.typing as npt
 
 import pygame
 import os
+import time
 
+from Common import CommonControl
+from Common import CommonText
 from . import RayMath as rMath
+from . import RayEngine
+from . import RayRoom
+from . import RayTextures
 import math
 
 
@@ -16,6 +22,12 @@ This is basically a python version of:
 """
 
 
+# how Raycaster.render casts its rays
+RENDER_SCALAR = 0  # one python DDA loop per screen column
+RENDER_NUMPY = 1  # every column at once as numpy arrays, see RayEngine
+RENDER_PARALLEL = 2  # strips of columns cast on a pool of worker processes, see RayEngine.StripCaster
+
+
 
 def set_dpi_aware():
     if os.name == "nt":
@@ -154,10 +166,10 @@ class Player:
 
 class Raycaster():
 
-    def __init__(self) -> None:
+    def __init__(self, room: npt.NDArray = None) -> None:
         
 
-        self.room = np.array([
+        self.room = room if room is not None else np.array([
             [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
             [1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1],
             [1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1],
@@ -196,6 +208,9 @@ class Raycaster():
         self.width = self.room.shape[0]
         self.height = self.room.shape[1]
 
+        # bumped by set_cell / set_room, anything cached from the room compares against it
+        self.room_version = 0
+
         # starting position
         self.pos_x = 22
         self.pos_y = 12
@@ -210,74 +225,281 @@ class Raycaster():
 
         self.last_mouse_x = -1
 
+        self.render_mode = RENDER_SCALAR
+
+        # how many screen columns share one ray, set by a ResolutionController to trade resolution for frame time
+        self.column_step = 1
+
+        # number of processes used by RENDER_PARALLEL, None for one per core
+        self.render_workers: int = None
+        self.strip_caster: RayEngine.StripCaster = None
+        self.strip_caster_key = None
+
+        # optional RayEngine.SkipField so rays can jump over open space, see enable_skip_field
+        self.skip_field: RayEngine.SkipField = None
+
+        # draw into a pixel buffer and blit once instead of one draw call per column / minimap cell
+        self.use_framebuffer = False
+        self.frame_surface: pygame.Surface = None
+        self.frame_palette_colors: list = None
+        self.frame_scaled_surface: pygame.Surface = None
+
+        # RayTextures.WallTextures to texture the walls with instead of self.colors, framebuffer only
+        self.wall_textures: RayTextures.WallTextures = None
+
+        # fill the floor and ceiling with textures from wall_textures instead of leaving them black
+        self.floor_casting = False
+        self.floor_texture = 3
+        self.ceiling_texture = 6
+
+        self.minimap_cell_size = 10
+        self.minimap_max_cells = 24
+        self.minimap_surface: pygame.Surface = None
+        self.minimap_key = None
+
+        # perp_wall_dist of every column of the last frame, kept for the sprite pass
+        self.z_buffer: npt.NDArray = None
+
+        # billboard sprites, flat colored and one cell wide / tall
+        self.sprite_pos = np.zeros((0, 2), dtype=np.float64)
+        self.sprite_colors = np.zeros((0, 3), dtype=np.uint8)
+        self.sprites_version = 0
+
+        # reuse the last frame while nothing it was drawn from changed, render copies the whole surface
+        # after drawing so anything drawn on it before render is kept too
+        self.use_frame_cache = False
+        self.frame_cache_surface: pygame.Surface = None
+        self.frame_cache_key = None
+        self.frame_cache_hits = 0
+        self.frame_cache_misses = 0
+
+        # seconds spent in each phase of the last render call
+        self.render_timings = {"dda": 0.0, "walls": 0.0, "floor": 0.0, "sprites": 0.0, "minimap": 0.0}
+
     
     def render(self, DRAW_SURFACE: pygame.Surface):
 
         w, h = DRAW_SURFACE.get_size()
 
-        for x in range(w):
+        if self.use_frame_cache:
 
-            camera_x = 2 * x / w - 1 # x coordinate in camera space 
+            frame_key = self.get_frame_key(w, h)
 
-            ray_dir_x = self.dir_x + self.plane_x * camera_x
-            ray_dir_y = self.dir_y + self.plane_y * camera_x
+            if frame_key == self.frame_cache_key:
 
+                self.frame_cache_hits += 1
 
-            if ray_dir_x == 0:
-                delta_dist_x = 1e30
-            else:
-                delta_dist_x = abs(1 / ray_dir_x)
+                DRAW_SURFACE.blit(self.frame_cache_surface, (0, 0))
 
-            if ray_dir_y == 0:
-                delta_dist_y = 1e30
-            else:
-                delta_dist_y = abs(1 / ray_dir_y)
+                for name in self.render_timings:
+                    self.render_timings[name] = 0.0
 
-            map_x = int(self.pos_x)
-            map_y = int(self.pos_y)
+                return
 
+            self.frame_cache_misses += 1
 
-            if ray_dir_x < 0:
-                step_x = -1
-                side_dist_x = (self.pos_x - map_x) * delta_dist_x
-            else:
-                step_x = 1
-                side_dist_x = (map_x + 1.0 - self.pos_x) * delta_dist_x
+        start = time.perf_counter()
 
-            if ray_dir_y < 0:
-                step_y = -1
-                side_dist_y = (self.pos_y - map_y) * delta_dist_y
-            else:
-                step_y = 1
-                side_dist_y = (map_y + 1.0 - self.pos_y) * delta_dist_y
+        # with a column step the walls are cast and drawn at a lower width and stretched over the screen
+        step = self.column_step
 
-            hit = 0 # was there a wall hit
+        hits = self.cast_columns(-(-w // step))
 
-            # perform DDA
-            while hit == 0:
-                
-                # jump to the next square in either x or y direction
-                if side_dist_x < side_dist_y:
+        if self.z_buffer is None or self.z_buffer.size != w:
+            self.z_buffer = np.empty(w, dtype=np.float64)
+
+        if step > 1:
+            np.copyto(self.z_buffer, np.repeat(hits.perp_wall_dist, step)[:w])
+        else:
+            np.copyto(self.z_buffer, hits.perp_wall_dist)
+
+        self.render_timings["floor"] = 0.0
+
+        cast_done = time.perf_counter()
+
+        if self.use_framebuffer:
+            self.draw_columns_framebuffer(DRAW_SURFACE, hits)
+        else:
+            self.draw_columns(DRAW_SURFACE, hits)
+
+        walls_done = time.perf_counter()
+
+        if len(self.sprite_pos):
+            self.render_sprites(DRAW_SURFACE)
+
+        sprites_done = time.perf_counter()
+
+        self.render_minimap(DRAW_SURFACE)
+
+        minimap_done = time.perf_counter()
+
+        self.render_timings["dda"] = cast_done - start
+        # the floor is cast while drawing the walls and timed on its own
+        self.render_timings["walls"] = walls_done - cast_done - self.render_timings["floor"]
+        self.render_timings["sprites"] = sprites_done - walls_done
+        self.render_timings["minimap"] = minimap_done - sprites_done
+
+        if self.use_frame_cache:
+
+            if self.frame_cache_surface is None or self.frame_cache_surface.get_size() != (w, h):
+                self.frame_cache_surface = pygame.Surface((w, h), 0, DRAW_SURFACE)
+
+            self.frame_cache_surface.blit(DRAW_SURFACE, (0, 0))
+            self.frame_cache_key = frame_key
+
+    def get_frame_key(self, w: int, h: int):
+        """everything a frame is drawn from, the frame cache is reused while this stays the same"""
+
+        return (
+            self.pos_x,
+            self.pos_y,
+            self.dir_x,
+            self.dir_y,
+            self.plane_x,
+            self.plane_y,
+            w,
+            h,
+            self.room_version,
+            self.sprites_version,
+            self.column_step,
+            self.use_framebuffer,
+            self.wall_textures,
+            self.floor_casting,
+            self.floor_texture,
+            self.ceiling_texture,
+            tuple(self.colors),
+            self.minimap_cell_size,
+            self.minimap_max_cells,
+        )
+
+    def cast_columns(self, w: int) -> RayEngine.RayHits:
+        """casts one ray per screen column, returns the per column perp_wall_dist, side and map_value"""
+
+        if self.render_mode == RENDER_SCALAR:
+
+            columns = [self.cast_column(x, w) for x in range(w)]
+
+            perp_wall_dist, side, map_x, map_y = (np.array(i) for i in zip(*columns))
+
+            return RayEngine.RayHits(perp_wall_dist, side, self.room[map_x, map_y], map_x, map_y)
+
+        if self.render_mode == RENDER_PARALLEL:
+
+            return self.get_strip_caster().cast_columns(
+                self.pos_x, self.pos_y, self.dir_x, self.dir_y, self.plane_x, self.plane_y, w
+            )
+
+        return RayEngine.cast_columns(
+            self.room, self.pos_x, self.pos_y, self.dir_x, self.dir_y, self.plane_x, self.plane_y, w, self.skip_field
+        )
+
+    def get_strip_caster(self):
+        """the worker pool gets a copy of the room when it starts, so it is restarted when the room changes"""
+
+        key = (self.room_version, self.render_workers, self.skip_field)
+
+        if self.strip_caster is None or self.strip_caster_key != key:
+
+            self.close()
 
-                    side_dist_x += delta_dist_x
-                    map_x += step_x
-                    side = 0
+            self.strip_caster = RayEngine.StripCaster(self.room, self.render_workers, skip_field=self.skip_field)
+            self.strip_caster_key = key
 
-                else:
-                    side_dist_y += delta_dist_y
-                    map_y += step_y
-                    side = 1
+        return self.strip_caster
 
-                if self.room[map_x][map_y] > 0:
-                    hit = 1
+    def close(self):
+
+        if self.strip_caster is not None:
+            self.strip_caster.close()
+            self.strip_caster = None
+
+    def cast_column(self, x: int, w: int):
+        """casts the ray of a single screen column, returns perp_wall_dist, side, map_x, map_y"""
+
+        camera_x = 2 * x / w - 1 # x coordinate in camera space 
+
+        ray_dir_x = self.dir_x + self.plane_x * camera_x
+        ray_dir_y = self.dir_y + self.plane_y * camera_x
+
+
+        if ray_dir_x == 0:
+            delta_dist_x = 1e30
+        else:
+            delta_dist_x = abs(1 / ray_dir_x)
+
+        if ray_dir_y == 0:
+            delta_dist_y = 1e30
+        else:
+            delta_dist_y = abs(1 / ray_dir_y)
+
+        map_x = int(self.pos_x)
+        map_y = int(self.pos_y)
+
+
+        if ray_dir_x < 0:
+            step_x = -1
+            side_dist_x = (self.pos_x - map_x) * delta_dist_x
+        else:
+            step_x = 1
+            side_dist_x = (map_x + 1.0 - self.pos_x) * delta_dist_x
+
+        if ray_dir_y < 0:
+            step_y = -1
+            side_dist_y = (self.pos_y - map_y) * delta_dist_y
+        else:
+            step_y = 1
+            side_dist_y = (map_y + 1.0 - self.pos_y) * delta_dist_y
+
+        # side_dist is recomputed from the number of lines crossed instead of summed up,
+        # that way RayEngine.SkipField can jump several lines and land on the exact same values
+        first_side_dist_x = side_dist_x
+        first_side_dist_y = side_dist_y
+        steps_x = 0
+        steps_y = 0
+
+        hit = 0 # was there a wall hit
+
+        # perform DDA
+        while hit == 0:
             
+            # jump to the next square in either x or y direction
+            if side_dist_x < side_dist_y:
+
+                steps_x += 1
+                side_dist_x = first_side_dist_x + steps_x * delta_dist_x
+                map_x += step_x
+                side = 0
 
-            # prevent the fish eye effect by not using the euclidean distance 
-            if side == 0:
-                perp_wall_dist = (side_dist_x - delta_dist_x)
             else:
-                perp_wall_dist = (side_dist_y - delta_dist_y)
+                steps_y += 1
+                side_dist_y = first_side_dist_y + steps_y * delta_dist_y
+                map_y += step_y
+                side = 1
+
+            if self.room[map_x, map_y] > 0:
+                hit = 1
+        
+
+        # prevent the fish eye effect by not using the euclidean distance 
+        if side == 0:
+            perp_wall_dist = (side_dist_x - delta_dist_x)
+        else:
+            perp_wall_dist = (side_dist_y - delta_dist_y)
+
+        return perp_wall_dist, side, map_x, map_y
+
+    def draw_columns(self, DRAW_SURFACE: pygame.Surface, hits: RayEngine.RayHits):
 
+        h = DRAW_SURFACE.get_height()
+
+        step = self.column_step
+
+        for column in range(hits.side.size):
+
+            x = column * step
+
+            perp_wall_dist = hits.perp_wall_dist[column]
+            side = hits.side[column]
 
             if perp_wall_dist == 0:
                 line_height = h 
@@ -295,29 +517,315 @@ class Raycaster():
                 draw_end = h - 1
 
 
-            map_value = self.room[map_x][map_y]
+            map_value = hits.map_value[column]
 
             color = self.colors[map_value]
 
             if side == 1:
                 color = (color[0] / 2, color[1] / 2, color[2] / 2)
 
-            pygame.draw.line(DRAW_SURFACE, color, (x, draw_start), (x, draw_end))
+            if step == 1:
+                pygame.draw.line(DRAW_SURFACE, color, (x, draw_start), (x, draw_end))
+            else:
+                # one rect for all the columns sharing the ray
+                pygame.draw.rect(DRAW_SURFACE, color, (x, int(draw_start), step, int(draw_end) - int(draw_start) + 1))
+
+    def get_palette(self):
+        """returns self.colors as an array followed by the side shaded copies, index with map_value + side * len(self.colors)"""
+
+        colors = np.array(self.colors, dtype=np.uint8)
+
+        return np.concatenate((colors, colors // 2))
+
+    def get_line_heights(self, hits: RayEngine.RayHits, h: int):
+
+        with np.errstate(divide="ignore"):
+            return np.where(hits.perp_wall_dist == 0, h, h // hits.perp_wall_dist)
+
+    def get_column_spans(self, hits: RayEngine.RayHits, h: int):
+        """returns the first and last row of every wall column, same as the clamping in draw_columns"""
+
+        line_height = self.get_line_heights(hits, h)
+
+        draw_start = np.maximum(-line_height / 2 + h / 2, 0)
+
+        draw_end = line_height / 2 + h / 2
+        draw_end[draw_end > h] = h - 1
+
+        return draw_start.astype(np.int16), draw_end.astype(np.int16)
+
+    def get_frame_surface(self, w: int, h: int):
+
+        if self.frame_surface is None or self.frame_surface.get_size() != (w, h):
+
+            self.frame_surface = pygame.Surface((w, h))
+            self.frame_palette_colors = None
+
+            # scratch arrays, laid out (row, column) to match the memory of the surface
+            self.frame_rows = np.arange(h, dtype=np.int16)[:, None]
+            self.frame_wall = np.empty((h, w), dtype=bool)
+            self.frame_scratch = np.empty((h, w), dtype=bool)
+
+        if self.frame_palette_colors != self.colors:
+
+            # the palette mapped to the pixel format of the surface so pixels2d can be written directly
+            self.frame_palette_colors = list(self.colors)
+            self.frame_palette = np.array([self.frame_surface.map_rgb(c) for c in self.get_palette()], dtype=np.uint32)
+
+        return self.frame_surface
+
+    def draw_columns_framebuffer(self, DRAW_SURFACE: pygame.Surface, hits: RayEngine.RayHits):
+
+        # one pixel column per cast column, stretched by column_step when it is blit
+        w, h = hits.side.size, DRAW_SURFACE.get_height()
+
+        frame_surface = self.get_frame_surface(w, h)
 
+        draw_start, draw_end = self.get_column_spans(hits, h)
 
-        map_size = 10
-        at_x, at_y = w - map_size*self.width, 0
-        for x in range(self.width):
-            for y in  range(self.height):
+        wall = self.frame_wall
+        np.greater_equal(self.frame_rows, draw_start, out=wall)
+        np.less_equal(self.frame_rows, draw_end, out=self.frame_scratch)
+        np.logical_and(wall, self.frame_scratch, out=wall)
 
-                map_value = self.room[x][y]
+        if self.wall_textures is None:
+            color = self.frame_palette[hits.map_value + hits.side * len(self.colors)]
+        else:
+            color = self.get_texture_columns(hits, h).T
+
+        # the view locks the surface, it has to be gone before the blit
+        pixels = pygame.surfarray.pixels2d(frame_surface)
+
+        np.multiply(wall, color, out=pixels.T)
+
+        floor_start = time.perf_counter()
+
+        if self.floor_casting and self.wall_textures is not None:
+            self.draw_floor_pixels(pixels.T, wall)
+
+        self.render_timings["floor"] = time.perf_counter() - floor_start
+
+        del pixels
+
+        if self.column_step > 1:
+            frame_surface = self.get_scaled_frame_surface(w * self.column_step, h)
+
+        DRAW_SURFACE.blit(frame_surface, (0, 0))
+
+    def get_scaled_frame_surface(self, w: int, h: int):
+        """the frame surface stretched to w columns, scaled into the same surface every frame"""
+
+        if self.frame_scaled_surface is None or self.frame_scaled_surface.get_size() != (w, h):
+            self.frame_scaled_surface = pygame.Surface((w, h), 0, self.frame_surface)
+
+        return pygame.transform.scale(self.frame_surface, (w, h), self.frame_scaled_surface)
+
+    def get_texture_columns(self, hits: RayEngine.RayHits, h: int):
+        """the (columns, h) mapped texture colors of the walls, rows outside the wall span are left over texture"""
+
+        textures = self.wall_textures
+        textures.map_to(self.frame_surface)
+
+        ray_dir_x, ray_dir_y = RayEngine.get_camera_rays(self.dir_x, self.dir_y, self.plane_x, self.plane_y, hits.side.size)
+
+        tex_x = textures.get_tex_x(hits, self.pos_x, self.pos_y, ray_dir_x, ray_dir_y)
+        texture = (hits.map_value.astype(np.int64) - 1) % textures.count + hits.side * textures.count
+
+        # walls further away than h are 0 rows high, which sample_columns would divide by
+        line_height = np.maximum(self.get_line_heights(hits, h), 1).astype(np.int64)
+
+        return textures.sample_columns(texture, tex_x, line_height, h)
+
+    def draw_floor_pixels(self, pixels: npt.NDArray, wall: npt.NDArray):
+        """fills every (row, column) of pixels that is not wall with the floor / ceiling texture, pixels must be 0 there"""
+
+        h, w = pixels.shape
+
+        textures = self.wall_textures
+
+        ray_dir_x, ray_dir_y = RayEngine.get_camera_rays(self.dir_x, self.dir_y, self.plane_x, self.plane_y, w)
+
+        texel = textures.get_floor_texels(self.pos_x, self.pos_y, ray_dir_x, ray_dir_y, h)
+
+        # row y of the floor is row h - y - 1 of the ceiling
+        floor_rows = slice(h // 2 + 1, h)
+        ceiling_rows = slice(h - h // 2 - 2, None, -1)
+
+        # both are darkened like in the tutorial
+        for rows, texture in ((floor_rows, self.floor_texture), (ceiling_rows, self.ceiling_texture)):
+
+            color = textures.mapped[texture + textures.count].ravel().take(texel)
+
+            # the pixels behind walls get color * 0, adding is cheaper than a masked copy
+            open_floor = np.logical_not(wall[rows], out=self.frame_scratch[rows])
+            np.multiply(color, open_floor, out=color)
+            np.add(pixels[rows], color, out=pixels[rows])
+
+    def get_sprite_columns(self, w: int, h: int):
+        """
+        returns the columns covered by a sprite in front of the walls, with the span and index of that sprite
+
+        every billboard is centered on the horizon and gets smaller with distance,
+        so the nearest sprite in a column covers all the sprites behind it and only that one has to be drawn
+        """
+
+        rel_x = self.sprite_pos[:, 0] - self.pos_x
+        rel_y = self.sprite_pos[:, 1] - self.pos_y
+
+        # transform the sprites with the inverse camera matrix
+        inv_det = 1.0 / (self.plane_x * self.dir_y - self.dir_x * self.plane_y)
+
+        transform_x = inv_det * (self.dir_y * rel_x - self.dir_x * rel_y)
+        transform_y = inv_det * (-self.plane_y * rel_x + self.plane_x * rel_y)  # the depth inside the screen
+
+        # anything behind the camera is never drawn
+        sprite = np.flatnonzero(transform_y > 0)
+        transform_x = transform_x[sprite]
+        transform_y = transform_y[sprite]
+
+        screen_x = ((w / 2) * (1 + transform_x / transform_y)).astype(np.int64)
+        size = np.abs(h / transform_y).astype(np.int64)
+
+        draw_start_x = np.clip(screen_x - size // 2, 0, w)
+        draw_end_x = np.clip(screen_x + size // 2, 0, w)
+        draw_start_y = np.maximum(-size // 2 + h // 2, 0)
+        draw_end_y = np.minimum(size // 2 + h // 2, h)
+
+        # one entry per (sprite, column) pair
+        widths = np.maximum(draw_end_x - draw_start_x, 0)
+        pair = np.repeat(np.arange(sprite.size), widths)
+        column = draw_start_x[pair] + np.arange(pair.size) - np.repeat(np.cumsum(widths) - widths, widths)
+
+        # clip against the walls
+        in_front = transform_y[pair] < self.z_buffer[column]
+        pair = pair[in_front]
+        column = column[in_front]
+
+        # sort by column then distance, the first pair of each column is the nearest sprite
+        order = np.lexsort((transform_y[pair], column))
+        column, first = np.unique(column[order], return_index=True)
+        pair = pair[order][first]
+
+        return column, draw_start_y[pair], draw_end_y[pair], sprite[pair]
+
+    def render_sprites(self, DRAW_SURFACE: pygame.Surface):
+
+        w, h = DRAW_SURFACE.get_size()
+
+        column, draw_start, draw_end, sprite = self.get_sprite_columns(w, h)
+
+        if not column.size:
+            return
+
+        rows = np.arange(h, dtype=np.int64)[:, None]
+        covered = (rows >= draw_start) & (rows < draw_end)
+
+        color = pygame.surfarray.map_array(DRAW_SURFACE, self.sprite_colors[sprite])
+
+        pixels = pygame.surfarray.pixels2d(DRAW_SURFACE).T
+
+        spans = pixels[:, column]
+        np.copyto(spans, color.astype(pixels.dtype), where=covered)
+        pixels[:, column] = spans
+
+        del pixels, spans
+
+    def add_sprite(self, x: float, y: float, color=(255, 255, 255)):
 
-                color = self.colors[map_value]
+        self.sprite_pos = np.append(self.sprite_pos, ((x, y),), axis=0)
+        self.sprite_colors = np.append(self.sprite_colors, np.array((color,), dtype=np.uint8), axis=0)
+        self.sprites_version += 1
 
-                if x == int(self.pos_x) and y == int(self.pos_y):
-                    color = (255, 255, 255)
+    def set_sprites(self, positions: npt.NDArray, colors: npt.NDArray):
+        """replaces every sprite, positions is (n, 2) in room cells and colors (n, 3)"""
 
-                pygame.draw.rect(DRAW_SURFACE, color, pygame.Rect(at_x + x*map_size, at_y + y*map_size, map_size, map_size))
+        self.sprite_pos = np.array(positions, dtype=np.float64).reshape(-1, 2)
+        self.sprite_colors = np.array(colors, dtype=np.uint8).reshape(-1, 3)
+        self.sprites_version += 1
+
+    def clear_sprites(self):
+
+        self.set_sprites(np.zeros((0, 2)), np.zeros((0, 3)))
+
+    def render_minimap(self, DRAW_SURFACE: pygame.Surface):
+
+        w, h = DRAW_SURFACE.get_size()
+
+        map_size = self.minimap_cell_size
+        x1, y1, x2, y2 = self.get_minimap_view()
+        at_x, at_y = w - map_size*(x2 - x1), 0
+
+        DRAW_SURFACE.blit(self.get_minimap_surface(), (at_x, at_y))
+
+        pygame.draw.rect(
+            DRAW_SURFACE,
+            (255, 255, 255),
+            pygame.Rect(at_x + (int(self.pos_x) - x1)*map_size, at_y + (int(self.pos_y) - y1)*map_size, map_size, map_size),
+        )
+
+    def get_minimap_view(self):
+        """the cells shown on the minimap, the whole room if it fits otherwise a window that follows the player"""
+
+        cells = self.minimap_max_cells
+
+        x1 = min(max(int(self.pos_x) - cells // 2, 0), max(self.width - cells, 0))
+        y1 = min(max(int(self.pos_y) - cells // 2, 0), max(self.height - cells, 0))
+
+        return x1, y1, min(x1 + cells, self.width), min(y1 + cells, self.height)
+
+    def get_minimap_surface(self):
+        """returns the minimap without the player, only redrawn when the room, colors or view change"""
+
+        view = self.get_minimap_view()
+
+        if self.minimap_surface is not None and self.minimap_key == (self.room_version, self.colors, view):
+            return self.minimap_surface
+
+        x1, y1, x2, y2 = view
+        map_size = self.minimap_cell_size
+
+        # the minimap is never shaded, only the first half of the palette is used
+        cells = self.get_palette()[self.room[x1:x2, y1:y2]]
+
+        self.minimap_surface = pygame.surfarray.make_surface(cells.repeat(map_size, axis=0).repeat(map_size, axis=1))
+        self.minimap_key = (self.room_version, list(self.colors), view)
+
+        return self.minimap_surface
+
+    @staticmethod
+    def from_file(path: str, mode: str = "r"):
+        """a raycaster over a room file, the room is memory mapped instead of loaded"""
+
+        return Raycaster(RayRoom.open_room(path, mode))
+
+    def set_cell(self, x: int, y: int, value: int):
+        """changes a single cell of the room, use this instead of writing to self.room so cached layers get rebuilt"""
+
+        self.room[x, y] = value
+        self.room_version += 1
+
+        if self.skip_field is not None:
+            self.skip_field.update_cell(self.room, x, y)
+
+    def set_room(self, room: npt.NDArray):
+        """replaces the whole room, can be a memory mapped room from RayRoom.open_room"""
+
+        self.room = room
+        self.width = self.room.shape[0]
+        self.height = self.room.shape[1]
+        self.room_version += 1
+
+        if self.skip_field is not None:
+            self.enable_skip_field(self.skip_field.max_skip)
+
+    def enable_skip_field(self, max_skip: int = 16):
+        """lets the numpy and parallel casters skip over open space, costs one byte per cell"""
+
+        self.skip_field = RayEngine.SkipField(self.room, max_skip)
+
+    def disable_skip_field(self):
+
+        self.skip_field = None
 
 
 
@@ -364,17 +872,17 @@ class Raycaster():
 
         if keys[pygame.K_w]:
             
-            if self.room[int(self.pos_x + self.dir_x * move_speed)][int(self.pos_y)] == 0:
+            if self.room[int(self.pos_x + self.dir_x * move_speed), int(self.pos_y)] == 0:
                 self.pos_x += self.dir_x * move_speed
 
-            if self.room[int(self.pos_x)][int(self.pos_y + self.dir_y * move_speed)] == 0:
+            if self.room[int(self.pos_x), int(self.pos_y + self.dir_y * move_speed)] == 0:
                 self.pos_y += self.dir_y * move_speed
 
         elif keys[pygame.K_s]:
-            if self.room[int(self.pos_x - self.dir_x * move_speed)][int(self.pos_y)] == 0:
+            if self.room[int(self.pos_x - self.dir_x * move_speed), int(self.pos_y)] == 0:
                 self.pos_x -= self.dir_x * move_speed
 
-            if self.room[int(self.pos_x)][int(self.pos_y - self.dir_y * move_speed)] == 0:
+            if self.room[int(self.pos_x), int(self.pos_y - self.dir_y * move_speed)] == 0:
                 self.pos_y -= self.dir_y * move_speed
 
 
@@ -388,6 +896,28 @@ class Raycaster():
 
 
 
+class ResolutionController(CommonControl.FrameTimeController):
+    """picks the column_step of a Raycaster from measured frame times, one more column per ray at every level"""
+
+    def __init__(self, target_fps: float = 60, max_step: int = 8, headroom: float = 0.7, settle_frames: int = 15) -> None:
+
+        super().__init__(target_fps, max_step - 1, headroom, settle_frames)
+
+        self.max_step = max_step
+
+    @property
+    def column_step(self):
+
+        return self.level + 1
+
+    def update(self, frame_time: float):
+        """returns the column step for the next frame"""
+
+        super().update(frame_time)
+
+        return self.column_step
+
+
 def render_top_down_view(DRAW_SURFACE: pygame.Surface, grid: Grid, player: Player):
 
     grid.render(DRAW_SURFACE)
@@ -400,23 +930,23 @@ def render_top_down_view(DRAW_SURFACE: pygame.Surface, grid: Grid, player: Playe
 class Fonts:
 
     FONT_CONSOLAS: pygame.font.Font = None
+    TEXT_CACHE: CommonText.TextCache = None
 
     @staticmethod
     def init():
         try:
             Fonts.FONT_CONSOLAS = pygame.font.Font("./assets/fonts/consolas.ttf", 32)
+            Fonts.TEXT_CACHE = CommonText.TextCache(Fonts.FONT_CONSOLAS)
         except Exception as e:
             print(f"Error loading font: {e}")
 
     @staticmethod
     def render_text(DRAW_SURFACE: pygame.Surface, text, x=0, y=0):
         
-        if Fonts.FONT_CONSOLAS is None:
+        if Fonts.TEXT_CACHE is None:
             return 
 
-        text = Fonts.FONT_CONSOLAS.render(text, True, (255, 255, 255))
-
-        DRAW_SURFACE.blit(text, text.get_rect(x=x, y=y))
+        Fonts.TEXT_CACHE.blit(DRAW_SURFACE, text, x, y)
 
 
 def main():
@@ -440,12 +970,28 @@ def main():
     grid = Grid(80, 80, WIDTH, HEIGHT)
     player = Player()
     raycaster = Raycaster()
+    raycaster.render_mode = RENDER_NUMPY
+    raycaster.use_framebuffer = True
+    raycaster.wall_textures = RayTextures.WallTextures()
+    raycaster.floor_casting = True
+
+    # most frames nothing moves, those are a single blit
+    raycaster.use_frame_cache = True
+
+    # drops to fewer rays than screen columns when the frames get too slow
+    resolution = ResolutionController(FRAME_RATE)
+
+    raycaster.add_sprite(20.5, 11.5, (200, 120, 40))
+    raycaster.add_sprite(18.5, 4.5, (200, 120, 40))
+    raycaster.add_sprite(10.5, 12.5, (40, 160, 200))
+    raycaster.add_sprite(3.5, 6.5, (180, 180, 180))
 
 
     clock = pygame.time.Clock()
 
-    time = 0
-    old_time = 0
+    # not time, that would shadow the time module
+    ticks = 0
+    old_ticks = 0
 
     play_game = True
     while play_game:
@@ -453,9 +999,12 @@ def main():
         pygame.display.update()
         clock.tick(FRAME_RATE)
 
-        old_time = time 
-        time = pygame.time.get_ticks()
-        frame_time = (time - old_time) / 1000
+        old_ticks = ticks
+        ticks = pygame.time.get_ticks()
+        frame_time = (ticks - old_ticks) / 1000
+
+        # get_rawtime is the work of the last frame without the wait of clock.tick
+        raycaster.column_step = resolution.update(clock.get_rawtime() / 1000)
 
         events = pygame.event.get()
         keys = pygame.key.get_pressed()
@@ -479,6 +1028,7 @@ def main():
         raycaster.input(keys, mouse_down, frame_time, WIDTH, HEIGHT)
 
         Fonts.render_text(GAME_WINDOW, f"FPS: {clock.get_fps():.0f}")
+        Fonts.render_text(GAME_WINDOW, f"RES: 1/{raycaster.column_step} {resolution.state}", y=32)
 
 
 
@@ -0,0 +1,370 @@
+import sys
+
+if __package__ is None and not hasattr(sys, "frozen"):
+    # direct call of __main__.py
+    import os.path
+
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.realpath(path))
+
+
+import argparse
+import json
+import os
+import time
+
+
+"""
+Headless benchmarks for the raycaster, prints the results as json
+
+    python -m Raycast.benchmark replay --out before.json
+    python -m Raycast.benchmark replay --compare before.json
+    python -m Raycast.benchmark parallel --width 3840 --max-workers 8
+    python -m Raycast.benchmark views --agents 1000 --columns 64
+    python -m Raycast.benchmark agents --agents 10000 --steps 1000
+"""
+
+
+# the scripted camera path of the replay benchmark, (frames, held keys), looped until the frame count is reached
+CAMERA_PATH = (
+    (60, ("w",)),
+    (30, ("a",)),
+    (90, ("w",)),
+    (45, ("d",)),
+    (40, ("s",)),
+    (20, ("a", "w")),
+    (60, ("d",)),
+    (80, ("w",)),
+    (30, ()),
+)
+
+
+class ScriptedKeys:
+    """stands in for pygame.key.get_pressed, only the given keys are down"""
+
+    def __init__(self, pressed) -> None:
+        self.pressed = set(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+def get_scripted_keys(frames: int):
+
+    import pygame
+
+    keys = []
+
+    while len(keys) < frames:
+        for count, names in CAMERA_PATH:
+            keys.extend([ScriptedKeys(pygame.key.key_code(name) for name in names)] * count)
+
+    return keys[:frames]
+
+
+def time_frames(func, frames: int):
+    """calls func once to warm up, then returns the average seconds per call"""
+
+    func()
+
+    start = time.perf_counter()
+
+    for _ in range(frames):
+        func()
+
+    return (time.perf_counter() - start) / frames
+
+
+def bench_replay(
+    width: int,
+    height: int,
+    frames: int,
+    mode: str,
+    framebuffer: bool,
+    textures: bool = False,
+    floor: bool = False,
+    column_step: int = 1,
+    target_fps: float = None,
+    frame_cache: bool = False,
+):
+    """
+    replays CAMERA_PATH through Raycaster.render and Raycaster.input without a frame cap
+
+    with target_fps the column step is picked by a ResolutionController from the frame times instead
+    """
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    import pygame
+    import Raycast
+    from Raycast import RayTextures
+
+    pygame.init()
+
+    DRAW_SURFACE = pygame.display.set_mode((width, height))
+
+    raycaster = Raycast.Raycaster()
+    raycaster.render_mode = getattr(Raycast, "RENDER_" + mode.upper())
+    raycaster.use_framebuffer = framebuffer
+    raycaster.floor_casting = floor
+
+    if textures or floor:
+        raycaster.wall_textures = RayTextures.WallTextures()
+
+    raycaster.column_step = column_step
+    raycaster.use_frame_cache = frame_cache
+    resolution = Raycast.ResolutionController(target_fps) if target_fps else None
+    column_steps = []
+
+    # a fixed frame time keeps the path the same no matter how fast the frames are
+    frame_time = 1 / 60
+
+    phases = {name: 0.0 for name in raycaster.render_timings}
+    phases["input"] = 0.0
+
+    start = time.perf_counter()
+
+    for keys in get_scripted_keys(frames):
+
+        frame_start = time.perf_counter()
+
+        DRAW_SURFACE.fill((0, 0, 0))
+        raycaster.render(DRAW_SURFACE)
+
+        input_start = time.perf_counter()
+        raycaster.input(keys, False, frame_time, width, height)
+        phases["input"] += time.perf_counter() - input_start
+
+        column_steps.append(raycaster.column_step)
+
+        if resolution is not None:
+            raycaster.column_step = resolution.update(time.perf_counter() - frame_start)
+
+        for name, seconds in raycaster.render_timings.items():
+            phases[name] += seconds
+
+    total = time.perf_counter() - start
+
+    raycaster.close()
+    pygame.quit()
+
+    return {
+        "width": width,
+        "height": height,
+        "frames": frames,
+        "mode": mode,
+        "framebuffer": framebuffer,
+        "textures": textures,
+        "floor": floor,
+        "target_fps": target_fps,
+        "column_step_mean": sum(column_steps) / frames,
+        "column_step_last": column_steps[-1],
+        "frame_cache": frame_cache,
+        "frame_cache_hits": raycaster.frame_cache_hits,
+        "frame_cache_misses": raycaster.frame_cache_misses,
+        "fps": frames / total,
+        "frame_ms": total / frames * 1000,
+        "phase_ms": {name: seconds / frames * 1000 for name, seconds in phases.items()},
+        # where the camera ended up, differs if a change altered the movement / collision
+        "final_pose": [raycaster.pos_x, raycaster.pos_y, raycaster.dir_x, raycaster.dir_y],
+    }
+
+
+def compare_replay(results: dict, baseline: dict):
+    """ratio of every timing against a previous run, below 1 is faster"""
+
+    return {
+        "fps": results["fps"] / baseline["fps"],
+        "frame_ms": results["frame_ms"] / baseline["frame_ms"],
+        "phase_ms": {
+            name: ms / baseline["phase_ms"][name]
+            for name, ms in results["phase_ms"].items()
+            if baseline["phase_ms"].get(name)
+        },
+        "same_final_pose": results["final_pose"] == baseline["final_pose"],
+    }
+
+
+def bench_parallel(width: int, max_workers: int, frames: int):
+    """how RENDER_PARALLEL scales from 1 to max_workers processes, against the single process numpy caster"""
+
+    import Raycast
+
+    raycaster = Raycast.Raycaster()
+
+    def cast():
+        raycaster.cast_columns(width)
+
+    raycaster.render_mode = Raycast.RENDER_NUMPY
+    numpy_seconds = time_frames(cast, frames)
+
+    results = {
+        "width": width,
+        "frames": frames,
+        "cpu_count": os.cpu_count(),
+        "numpy_ms": numpy_seconds * 1000,
+        "parallel": [],
+    }
+
+    raycaster.render_mode = Raycast.RENDER_PARALLEL
+
+    for workers in range(1, max_workers + 1):
+
+        raycaster.render_workers = workers
+        seconds = time_frames(cast, frames)
+
+        results["parallel"].append(
+            {
+                "workers": workers,
+                "ms": seconds * 1000,
+                "speedup_vs_1": results["parallel"][0]["ms"] / (seconds * 1000) if results["parallel"] else 1.0,
+                "speedup_vs_numpy": numpy_seconds / seconds,
+            }
+        )
+
+    raycaster.close()
+
+    return results
+
+
+def bench_views(agents: int, columns: int, frames: int, width: int, seed: int = 0):
+    """casts many small viewpoints in one batch with RayEngine.cast_views, against casting one full screen"""
+
+    import numpy as np
+    import Raycast
+    from Raycast import RayEngine
+
+    raycaster = Raycast.Raycaster()
+    rng = np.random.default_rng(seed)
+
+    # random poses in the empty cells of the room
+    cells = np.argwhere(raycaster.room == 0)
+    pos = cells[rng.integers(len(cells), size=agents)] + rng.random((agents, 2))
+
+    angle = rng.random(agents) * 2 * np.pi
+    dir = np.stack((np.cos(angle), np.sin(angle)), axis=1)
+
+    def cast_views():
+        RayEngine.cast_views(raycaster.room, pos, dir, columns=columns)
+
+    raycaster.render_mode = Raycast.RENDER_NUMPY
+
+    def cast_screen():
+        raycaster.cast_columns(width)
+
+    views_seconds = time_frames(cast_views, frames)
+    screen_seconds = time_frames(cast_screen, frames)
+
+    return {
+        "agents": agents,
+        "columns": columns,
+        "rays": agents * columns,
+        "views_ms": views_seconds * 1000,
+        "screen_width": width,
+        "screen_ms": screen_seconds * 1000,
+        "views_vs_screen": views_seconds / screen_seconds,
+    }
+
+
+def bench_agents(agents: int, steps: int, seed: int = 0):
+    """steps a RayAgents.AgentEnvironment with random actions, without a display"""
+
+    import numpy as np
+    import Raycast
+    from Raycast import RayAgents
+
+    env = RayAgents.AgentEnvironment(Raycast.Raycaster().room, agents, seed)
+    actions = RayAgents.ACTIONS[np.random.default_rng(seed).integers(len(RayAgents.ACTIONS), size=(steps, agents))]
+
+    start = time.perf_counter()
+
+    for step_actions in actions:
+        env.step(step_actions)
+
+    seconds = time.perf_counter() - start
+
+    return {
+        "agents": agents,
+        "steps": steps,
+        "step_ms": seconds / steps * 1000,
+        "agent_steps_per_minute": agents * steps / seconds * 60,
+        # differs if a change altered the movement / collision
+        "final_pos_sum": [float(env.pos_x.sum()), float(env.pos_y.sum())],
+    }
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="headless raycaster benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser("replay", help="replay a scripted camera path with the dummy video driver")
+    replay.add_argument("--width", type=int, default=801)
+    replay.add_argument("--height", type=int, default=801)
+    replay.add_argument("--frames", type=int, default=600)
+    replay.add_argument("--mode", choices=("scalar", "numpy", "parallel"), default="numpy")
+    replay.add_argument("--no-framebuffer", action="store_true")
+    replay.add_argument("--textures", action="store_true", help="textured walls, framebuffer only")
+    replay.add_argument("--floor", action="store_true", help="floor and ceiling casting, framebuffer only")
+    replay.add_argument("--column-step", type=int, default=1, help="screen columns per ray")
+    replay.add_argument("--target-fps", type=float, help="pick the column step from the frame times to hold this fps")
+    replay.add_argument("--frame-cache", action="store_true", help="reuse frames while the camera stands still")
+    replay.add_argument("--out", help="also write the results to this file")
+    replay.add_argument("--compare", help="results of a previous run to compare against")
+
+    parallel = commands.add_parser("parallel", help="scaling of the multi process column caster")
+    parallel.add_argument("--width", type=int, default=3840)
+    parallel.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parallel.add_argument("--frames", type=int, default=30)
+
+    views = commands.add_parser("views", help="batched casting of many viewpoints")
+    views.add_argument("--agents", type=int, default=1000)
+    views.add_argument("--columns", type=int, default=64)
+    views.add_argument("--width", type=int, default=801, help="width of the full screen cast to compare against")
+    views.add_argument("--frames", type=int, default=30)
+    views.add_argument("--seed", type=int, default=0)
+
+    agents = commands.add_parser("agents", help="headless stepping of many agents")
+    agents.add_argument("--agents", type=int, default=10000)
+    agents.add_argument("--steps", type=int, default=1000)
+    agents.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+
+        results = bench_replay(
+            args.width,
+            args.height,
+            args.frames,
+            args.mode,
+            not args.no_framebuffer,
+            args.textures,
+            args.floor,
+            args.column_step,
+            args.target_fps,
+            args.frame_cache,
+        )
+
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+
+        if args.compare:
+            with open(args.compare) as f:
+                results["compare"] = compare_replay(results, json.load(f))
+
+    elif args.command == "parallel":
+        results = bench_parallel(args.width, args.max_workers, args.frames)
+
+    elif args.command == "views":
+        results = bench_views(args.agents, args.columns, args.frames, args.width, args.seed)
+
+    elif args.command == "agents":
+        results = bench_agents(args.agents, args.steps, args.seed)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())